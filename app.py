@@ -1,17 +1,29 @@
 import streamlit as st
-from components.funding_rates_updated import display_funding_rates
+from components.funding_rates_updated import display_funding_rates, FUNDING_INTERVAL_HOURS
 from components.pnl_analysis import display_pnl_analysis
-from utils.exchange_client import ExchangeClient
+from utils.exchange_client import get_exchange_client
+from utils.data_processor import DataProcessor
 import gc
 import time
 import os
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 from components.positions import render_positions_table
 import plotly.express as px
+import plotly.graph_objects as go
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import itertools
+import json
 import logging
 
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+# Per-symbol fetch progress is debug output; keep only warnings from the funding component
+logging.getLogger('components.funding_rates_updated').setLevel(logging.WARNING)
+
 # Set page config
 st.set_page_config(
     page_title="Crypto Trading Dashboard",
@@ -101,33 +113,16 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize exchange client
-@st.cache_resource(ttl=3600)  # Cache for 1 hour
-def get_exchange_client():
-    """Get a cached instance of the ExchangeClient with credentials from Streamlit secrets.
+@st.cache_resource
+def _load_credentials() -> dict:
+    """Load and validate exchange credentials from Streamlit secrets once per process.
 
     Returns:
-        ExchangeClient: An initialized exchange client instance.
-    """
-    return ExchangeClient()
-
-# Clean up old resources before creating new ones
-if 'client' in st.session_state:
-    del st.session_state.client
-
-# Force garbage collection
-gc.collect()
+        dict: Credentials keyed by exchange name.
 
-print('session secrets', st.secrets)
-
-# Clear session state for credentials
-if 'exchange_credentials' in st.session_state:
-    del st.session_state.exchange_credentials
-
-# Initialize session state for credentials if not exists
-if 'exchange_credentials' not in st.session_state:
-    print("Checking credentials")
-    print(st.secrets)
+    Raises:
+        ValueError: If any exchange is missing required credentials.
+    """
     # Load credentials from secrets
     hyperliquid_wallet = st.secrets.get("HYPERLIQUID_API_KEY")
     hyperliquid_key = st.secrets.get("HYPERLIQUID_SECRET_KEY")
@@ -148,27 +143,15 @@ if 'exchange_credentials' not in st.session_state:
     rabbitx_jwt_token = st.secrets.get("RABBITX_JWT_TOKEN")
 
     # Log credential status without printing actual values
-    print(f"Loading Binance credentials:")
-    print(f"API Key present: {bool(binance_api_key)}")
-    print(f"Secret present: {bool(binance_secret)}")
-    
-    print(f"Loading Bybit credentials:")
-    print(f"API Key present: {bool(bybit_api_key)}")
-    print(f"Secret present: {bool(bybit_secret)}")
-    
-    print(f"Loading OKX credentials:")
-    print(f"API Key present: {bool(okx_api_key)}")
-    print(f"Secret present: {bool(okx_secret)}")
-    print(f"Password present: {bool(okx_password)}")
-    
-    print(f"Loading RabbitX credentials:")
-    print(f"API Key present: {bool(rabbitx_api_key)}")
-    print(f"Secret present: {bool(rabbitx_secret)}")
-    print(f"JWT Token present: {bool(rabbitx_jwt_token)}")
-    
-    print(f"Loading Hyperliquid credentials:")
-    print(f"Wallet Address present: {bool(hyperliquid_wallet)}")
-    print(f"Private Key present: {bool(hyperliquid_key)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Credentials present: binance=%s bybit=%s okx=%s rabbitx=%s hyperliquid=%s",
+            bool(binance_api_key and binance_secret),
+            bool(bybit_api_key and bybit_secret),
+            bool(okx_api_key and okx_secret and okx_password),
+            bool(rabbitx_api_key and rabbitx_secret and rabbitx_jwt_token),
+            bool(hyperliquid_wallet and hyperliquid_key)
+        )
     
     # Check if any credentials are missing
     if not binance_api_key or not binance_secret:
@@ -182,7 +165,7 @@ if 'exchange_credentials' not in st.session_state:
     if not rabbitx_api_key or not rabbitx_secret or not rabbitx_jwt_token:
         raise ValueError("RabbitX credentials are missing. Please check your configuration.")
     
-    st.session_state.exchange_credentials = {
+    return {
         'binance': {
             'api_key': binance_api_key,
             'secret': binance_secret
@@ -207,6 +190,9 @@ if 'exchange_credentials' not in st.session_state:
         }
     }
 
+# Share the credentials with components that read them from session state
+st.session_state.exchange_credentials = _load_credentials()
+
 # Configure sidebar
 with st.sidebar:
     st.markdown("## 🧰 Dashboard Controls")
@@ -256,6 +242,11 @@ with st.sidebar:
         help="Choose between compact or detailed view"
     )
     
+    # Drop cached resources on demand; st.cache_resource bounds their lifetime otherwise
+    if st.button("🧹 Force Cleanup", help="Recreate the exchange client and free unused memory"):
+        get_exchange_client.clear()
+        gc.collect()
+    
     st.markdown("---")
     st.markdown(f"**Last updated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
@@ -270,9 +261,6 @@ st.markdown('<p style="font-size: 1rem;">Analyze your crypto positions and fundi
 # Get exchange client
 client = get_exchange_client()
 
-# Store client in session state for cleanup
-st.session_state.client = client
-
 # Consolidated time period selector at the top
 st.markdown("---")
 days = st.selectbox(
@@ -288,7 +276,21 @@ days = st.selectbox(
     format_func=lambda x: x[1]  # Display the formatted string
 )[0]  # Get the actual number value
 
-async def update_dashboard_data(client):
+# Limit on concurrent funding history requests per exchange, to respect rate limits
+MAX_CONCURRENT_PER_EXCHANGE = 4
+
+@st.cache_resource
+def get_event_loop():
+    """Get a long-lived event loop shared by all sessions.
+
+    The loop runs forever in a daemon thread, so coroutines from concurrent
+    sessions can be submitted to it without creating a new loop per rerun.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+async def update_dashboard_data(client, exchanges_lc, days):
     # Get positions and funding data from all exchanges first
     all_positions = []
     delta_exposure = {}
@@ -297,82 +299,119 @@ async def update_dashboard_data(client):
     total_pnl = 0
     total_delta = 0  # Initialize total_delta
 
-    # Get trading fees
-    fees_by_exchange = await client.fee_tracker.update_fees()
+    # Get trading fees; the fee tracker makes blocking calls, so keep them off the shared loop
+    fees_by_exchange = await asyncio.to_thread(client.fee_tracker.update_fees)
     total_fees = client.fee_tracker.get_total_fees()
 
-    # Dictionary to store funding intervals by exchange and symbol
-    funding_intervals = {
-        'hyperliquid': 1,  # 1 hour interval
-        'bybit': 8,        # 8 hour interval
-        'binance': 8,      # 8 hour interval
-        'okx': 8,          # 8 hour interval
-        'rabbitx': 1       # 1 hour interval
-    }
+    async def fetch_exchange(exchange):
+        """Fetch positions and their funding rate histories for one exchange.
 
-    for exchange in [e.lower() for e in selected_exchanges]:
+        The exchange client is synchronous, so the positions call runs in a
+        worker thread; funding histories for all position symbols are then
+        fetched with a single batched call. Errors are returned rather than
+        raised so one failing exchange doesn't cancel the others.
+        """
         try:
-            positions = client.get_positions(exchange)
-            
-            if positions:
-                # Get funding rates and calculate funding PnL for each position
-                for pos in positions:
-                    pos['exchange'] = exchange
-                    symbol = pos['raw_symbol']
-                    
-                    # Calculate position value and delta
-                    position_value = abs(pos['size'] * pos['current_price'])
-                    position_delta = pos['size'] * pos['current_price'] * (1 if pos['side'].lower() == 'long' else -1)
-                    total_position_value += position_value
-                    total_delta += position_delta  # Add to total_delta
-                    
-                    # Get funding rate history for this position
-                    funding_history = client.get_funding_rate_history(exchange, symbol, days)
-                    
-                    if not funding_history.empty:
-                        # Get the funding interval for this exchange
-                        interval_hours = funding_intervals.get(exchange, 8)  # Default to 8 hours if not specified
-                        
-                        # Calculate number of funding periods in the selected time range
-                        periods_in_timeframe = (days * 24) / interval_hours
-                        
-                        # Calculate average funding rate for the period
-                        avg_funding_rate = funding_history['fundingRate'].mean()
-                        
-                        # Calculate funding PnL
-                        # If long position: we pay negative rates and receive positive rates
-                        # If short position: we pay positive rates and receive negative rates
-                        position_multiplier = 1 if pos['side'].lower() == 'long' else -1
-                        funding_pnl = position_value * avg_funding_rate * periods_in_timeframe * position_multiplier
-                        
-                        # Store funding PnL in position data
-                        pos['funding_pnl'] = funding_pnl
-                        total_funding_pnl += funding_pnl
-                    else:
-                        pos['funding_pnl'] = 0
-                    
-                    # Update remaining metrics
-                    total_pnl += pos['pnl']
-                    
-                all_positions.extend(positions)
-                
-                # Calculate delta exposure
-                for pos in positions:
-                    symbol = pos['symbol']
-                    delta = pos['size'] * pos['current_price'] * (1 if pos['side'].lower() == 'long' else -1)
-                    
-                    if symbol not in delta_exposure:
-                        delta_exposure[symbol] = {
-                            'total_delta': 0,
-                            'exchanges': {ex.lower(): 0 for ex in selected_exchanges},
-                            'funding_pnl': 0
-                        }
-                    
-                    delta_exposure[symbol]['total_delta'] += delta
-                    delta_exposure[symbol]['exchanges'][exchange] = delta
-                    delta_exposure[symbol]['funding_pnl'] += pos['funding_pnl']
+            positions = await asyncio.to_thread(client.get_positions, exchange)
+            if not positions:
+                return [], {}
+            symbols = [pos['raw_symbol'] for pos in positions]
+            funding_by_symbol = await client.get_funding_rate_history_batch(
+                exchange, symbols, days, max_concurrency=MAX_CONCURRENT_PER_EXCHANGE
+            )
+            return positions, funding_by_symbol
         except Exception as e:
-            st.error(f"Error fetching {exchange} positions: {str(e)}")
+            return e
+
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(fetch_exchange(exchange)) for exchange in exchanges_lc]
+    results = [task.result() for task in tasks]
+
+    # Errors are returned with the data; this coroutine runs on the shared
+    # event loop thread, which can't write to the page
+    errors = []
+    funding_frames = []
+    for exchange, result in zip(exchanges_lc, results):
+        if isinstance(result, Exception):
+            errors.append(f"Error fetching {exchange} positions: {str(result)}")
+            continue
+
+        positions, funding_by_symbol = result
+        for pos in positions:
+            pos['exchange'] = exchange
+        all_positions.extend(positions)
+
+        # Tag each funding history with its exchange and symbol for a single concat
+        funding_frames.extend(
+            history[['fundingRate']].assign(exchange=exchange, raw_symbol=symbol)
+            for symbol, history in funding_by_symbol.items()
+            if not history.empty
+        )
+
+    if all_positions:
+        positions_df = pd.DataFrame(all_positions)
+
+        # Average funding rate per (exchange, symbol) over the period
+        if funding_frames:
+            avg_rates = (
+                pd.concat(funding_frames, ignore_index=True)
+                .groupby(['exchange', 'raw_symbol'])['fundingRate']
+                .mean()
+                .rename('avg_funding_rate')
+            )
+            positions_df = positions_df.join(avg_rates, on=['exchange', 'raw_symbol'])
+        else:
+            positions_df['avg_funding_rate'] = np.nan
+
+        # Calculate position value and delta
+        position_multiplier = np.where(positions_df['side'].str.lower() == 'long', 1, -1)
+        signed_value = positions_df['size'] * positions_df['current_price']
+        position_value = signed_value.abs()
+
+        # Calculate number of funding periods in the selected time range
+        # (default to 8 hour intervals if the exchange is not listed)
+        periods_in_timeframe = (days * 24) / positions_df['exchange'].map(FUNDING_INTERVAL_HOURS).fillna(8)
+
+        # Calculate funding PnL
+        # If long position: we pay negative rates and receive positive rates
+        # If short position: we pay positive rates and receive negative rates
+        # Positions without funding history contribute no funding PnL
+        positions_df['funding_pnl'] = (
+            position_value * positions_df['avg_funding_rate'] * periods_in_timeframe * position_multiplier
+        ).fillna(0)
+
+        total_position_value = float(position_value.sum())
+        total_delta = float((signed_value * position_multiplier).sum())
+        total_funding_pnl = float(positions_df['funding_pnl'].sum())
+        total_pnl = float(positions_df['pnl'].sum())
+
+        # Store funding PnL in position data
+        for pos, funding_pnl in zip(all_positions, positions_df['funding_pnl'].tolist()):
+            pos['funding_pnl'] = funding_pnl
+
+    # Calculate delta exposure and group positions by token in the same pass
+    positions_by_token = {}
+    for pos in all_positions:
+        symbol = pos['symbol']
+        exchange = pos['exchange']
+        delta = pos['size'] * pos['current_price'] * (1 if pos['side'].lower() == 'long' else -1)
+        
+        if symbol not in delta_exposure:
+            delta_exposure[symbol] = {
+                'total_delta': 0,
+                'exchanges': {ex: 0 for ex in exchanges_lc},
+                'funding_pnl': 0
+            }
+        
+        delta_exposure[symbol]['total_delta'] += delta
+        delta_exposure[symbol]['exchanges'][exchange] = delta
+        delta_exposure[symbol]['funding_pnl'] += pos['funding_pnl']
+        
+        positions_by_token.setdefault(symbol, {})[exchange] = {
+            'size': pos['size'],
+            'current_price': pos['current_price'],
+            'side': pos['side']
+        }
 
     # Calculate total delta and trading PnL
     trading_pnl = total_pnl - total_funding_pnl
@@ -380,23 +419,154 @@ async def update_dashboard_data(client):
     return {
         'all_positions': all_positions,
         'delta_exposure': delta_exposure,
+        'positions_by_token': positions_by_token,
         'total_funding_pnl': total_funding_pnl,
         'total_position_value': total_position_value,
         'total_pnl': total_pnl,
         'fees_by_exchange': fees_by_exchange,
         'total_fees': total_fees,
-        'total_delta': total_delta  # Include total_delta in returned data
+        'total_delta': total_delta,  # Include total_delta in returned data
+        'errors': errors
     }
 
-def main():
-    # Initialize the client
-    client = ExchangeClient()
+@st.cache_data(ttl=300, show_spinner=False)  # Upper bound; refresh_bucket expires entries sooner
+def load_dashboard_data(exchanges_lc, days, refresh_bucket):
+    """Fetch and aggregate positions, funding and fee data for the dashboard.
+
+    Args:
+        exchanges_lc (tuple): Lowercased names of the selected exchanges
+        days (int): Number of days to analyze
+        refresh_bucket (int): Index of the current refresh interval, so a new
+            interval triggers a fresh fetch
+
+    Returns:
+        dict: Aggregated dashboard data
+    """
+    client = get_exchange_client()
+    future = asyncio.run_coroutine_threadsafe(
+        update_dashboard_data(client, exchanges_lc, days), get_event_loop()
+    )
+    return future.result()
+
+@st.cache_data(ttl=300, show_spinner=False)  # Cache for 5 minutes
+def build_funding_chart(exchange, symbols, days):
+    """Build the faceted funding rate chart for one exchange.
+
+    Args:
+        exchange (str): Lowercased exchange name
+        symbols (tuple): Sorted raw symbols of the active positions
+        days (int): Number of days of history to plot
+
+    Returns:
+        tuple: The figure as JSON (None if no symbol had data), the symbols
+            without funding data, and error messages for failed fetches
+    """
+    client = get_exchange_client()
+    
+    # Fetch all symbols for the exchange in one batched call on the shared loop
+    symbol_histories = []
+    missing_symbols = []
+    errors = []
+    try:
+        funding_by_symbol = asyncio.run_coroutine_threadsafe(
+            client.get_funding_rate_history_batch(
+                exchange, symbols, days, max_concurrency=MAX_CONCURRENT_PER_EXCHANGE
+            ),
+            get_event_loop()
+        ).result()
+    except Exception as e:
+        errors.append(f"Error fetching {exchange} funding rates: {str(e)}")
+        funding_by_symbol = {}
+    
+    for symbol, funding_history in funding_by_symbol.items():
+        if not funding_history.empty:
+            symbol_histories.append(funding_history[['fundingTime', 'fundingRate']].assign(symbol=symbol))
+        else:
+            missing_symbols.append(symbol)
+    
+    if not symbol_histories:
+        return None, missing_symbols, errors
+    
+    combined = DataProcessor.compress_df(pd.concat(symbol_histories, ignore_index=True))
+    
+    # Create one faceted funding rate chart per exchange
+    facet_rows = -(-combined['symbol'].nunique() // 3)
+    fig = px.line(
+        combined,
+        x='fundingTime',
+        y='fundingRate',
+        facet_col='symbol',
+        facet_col_wrap=3,
+        title=f"{exchange.capitalize()} Funding Rates",
+        labels={'fundingRate': 'Funding Rate (%)', 'fundingTime': 'Time'},
+    )
+    
+    # Customize the chart
+    fig.update_traces(mode='lines+markers')
+    fig.update_yaxes(tickformat='.4%', title_text='')
+    fig.update_xaxes(title_text='')
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split('=')[-1]))
+    fig.update_layout(
+        height=300 * facet_rows,
+        showlegend=False
+    )
+    
+    # Add horizontal line at y=0
+    fig.add_hline(
+        y=0,
+        line_dash="dash",
+        line_color="gray",
+        opacity=0.5
+    )
     
-    # Get dashboard data asynchronously
-    dashboard_data = asyncio.run(update_dashboard_data(client))
+    # Color positive rates green and negative rates red
+    fig.update_traces(
+        line=dict(
+            color='#2ECC71',
+            width=2
+        )
+    )
+    fig.for_each_trace(
+        lambda trace: trace.update(
+            marker_color=np.where(np.asarray(trace.y) >= 0, '#2ECC71', '#E74C3C')
+        )
+    )
     
-    # Use the dashboard data to render the UI
-    days = 30  # or however you calculate this
+    return fig.to_json(), missing_symbols, errors
+
+def color_rows_by_side(df):
+    """Color every cell green for long rows and red for short rows.
+
+    Args:
+        df (pd.DataFrame): Display frame with a 'Side' column
+
+    Returns:
+        pd.DataFrame: CSS color strings shaped like ``df``
+    """
+    is_long = df['Side'].to_numpy()[:, None] == 'LONG'
+    colors = np.where(is_long, 'color: #2ECC71', 'color: #E74C3C')
+    return pd.DataFrame(np.broadcast_to(colors, df.shape), index=df.index, columns=df.columns)
+
+def main():
+    exchanges_lc = tuple(e.lower() for e in selected_exchanges)
+
+    # Reuse the cached client
+    client = get_exchange_client()
+    
+    # Get dashboard data, reusing the cached result within the refresh interval
+    dashboard_data = load_dashboard_data(exchanges_lc, days, int(time.time() // refresh_interval))
+    for error in dashboard_data['errors']:
+        st.error(error)
+    
+    # Build one positions frame and derive every per-exchange view from it
+    positions_df = pd.DataFrame(dashboard_data['all_positions'])
+    if not positions_df.empty:
+        positions_df['notional'] = positions_df['size'].abs() * positions_df['current_price']
+        positions_df['delta'] = (
+            positions_df['size'] * positions_df['current_price']
+            * np.where(positions_df['side'].str.lower() == 'long', 1, -1)
+        )
+    positions_by_exchange = dict(tuple(positions_df.groupby('exchange'))) if not positions_df.empty else {}
     
     # Display consolidated metrics at the top
     st.markdown("### 📊 Overview")
@@ -485,39 +655,38 @@ def main():
         for symbol, data in dashboard_data['delta_exposure'].items():
             # Calculate token quantity delta for each exchange
             exchange_deltas = {}
-            for exchange in [e.lower() for e in selected_exchanges]:
+            for exchange in exchanges_lc:
                 if show_dollar_value:
                     exchange_deltas[exchange] = data['exchanges'][exchange]
                 else:
                     # Find the current price from positions to convert dollar delta back to token quantity
-                    exchange_positions = [p for p in dashboard_data['all_positions'] if p['exchange'] == exchange and p['symbol'] == symbol]
-                    if exchange_positions:
-                        current_price = exchange_positions[0]['current_price']
+                    position = dashboard_data['positions_by_token'].get(symbol, {}).get(exchange)
+                    if position:
+                        current_price = position['current_price']
                         exchange_deltas[exchange] = data['exchanges'][exchange] / current_price if current_price != 0 else 0
                     else:
                         exchange_deltas[exchange] = 0
 
+            total_delta = data['total_delta'] if show_dollar_value else sum(exchange_deltas.values())
             row = {
                 'Token': symbol,
-                'Total Delta': (f"${data['total_delta']:,.2f}" if show_dollar_value 
-                              else f"{sum(exchange_deltas.values()):,.4f} {symbol}"),
+                'Total Delta': (f"${total_delta:,.2f}" if show_dollar_value 
+                              else f"{total_delta:,.4f} {symbol}"),
                 'Funding PnL': f"${data['funding_pnl']:,.2f}",
+                '_sort_key': abs(total_delta),
             }
             
             # Add exchange-specific deltas
-            for exchange in [e.lower() for e in selected_exchanges]:
+            for exchange in exchanges_lc:
                 delta_value = exchange_deltas[exchange]
                 row[f"{exchange.capitalize()} Delta"] = (f"${delta_value:,.2f}" if show_dollar_value 
                                                        else f"{delta_value:,.4f} {symbol}")
             delta_data.append(row)
         
-        # Sort by absolute total delta
-        if show_dollar_value:
-            delta_data.sort(key=lambda x: abs(float(x['Total Delta'].replace('$', '').replace(',', ''))), reverse=True)
-        else:
-            delta_data.sort(key=lambda x: abs(float(x['Total Delta'].split()[0].replace(',', ''))), reverse=True)
+        # Sort by absolute total delta using the raw numeric value
+        delta_data.sort(key=lambda x: x['_sort_key'], reverse=True)
         
-        delta_df = pd.DataFrame(delta_data)
+        delta_df = pd.DataFrame(delta_data).drop(columns='_sort_key')
         st.dataframe(delta_df, hide_index=True)
     else:
         st.info("No active positions found")
@@ -525,60 +694,52 @@ def main():
     # Add Arbitrage Opportunities section
     st.markdown("### 📊 Cross-Exchange Arbitrage Positions")
 
-    # Create a dictionary to store positions by token
-    positions_by_token = {}
-    for pos in dashboard_data['all_positions']:
-        token = pos['symbol']
-        exchange = pos['exchange']
-        if token not in positions_by_token:
-            positions_by_token[token] = {}
-        positions_by_token[token][exchange] = {
-            'size': pos['size'],
-            'current_price': pos['current_price'],
-            'side': pos['side']
-        }
-
     # Filter tokens that have positions on multiple exchanges
+    arb_tokens = {
+        token: exchange_data
+        for token, exchange_data in dashboard_data['positions_by_token'].items()
+        if len(exchange_data) > 1
+    }
+
+    # Get the latest funding rate once per (exchange, token), fetching concurrently
+    unique_pairs = {(exchange, token) for token, exchange_data in arb_tokens.items() for exchange in exchange_data}
+    latest_rates = {}
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        futures = {
+            executor.submit(client.get_funding_rate_history, exchange, token, days=1): (exchange, token)
+            for exchange, token in unique_pairs
+        }
+        for future in as_completed(futures):
+            exchange, token = futures[future]
+            latest_rates[(exchange, token)] = 0
+            try:
+                funding_df = future.result()
+                if not funding_df.empty:
+                    latest_rates[(exchange, token)] = funding_df.iloc[-1]['fundingRate']
+            except Exception as e:
+                logging.error(f"Error getting funding rate for {token} on {exchange}: {e}")
+
+    # Calculate price and funding rate spreads for every exchange pair
     arb_opportunities = []
-    for token, exchange_data in positions_by_token.items():
-        if len(exchange_data) > 1:
-            exchanges = list(exchange_data.keys())
-            
-            # Calculate price spreads
-            for i in range(len(exchanges)):
-                for j in range(i + 1, len(exchanges)):
-                    exchange1, exchange2 = exchanges[i], exchanges[j]
-                    price1 = exchange_data[exchange1]['current_price']
-                    price2 = exchange_data[exchange2]['current_price']
-                    price_spread = abs(price1 - price2)
-                    price_spread_bps = (price_spread / min(price1, price2)) * 10000  # Convert to basis points
-                    
-                    # Get funding rates for both exchanges
-                    funding_rate1 = 0
-                    funding_rate2 = 0
-                    try:
-                        funding_df1 = client.get_funding_rate_history(exchange1, token, days=1)
-                        if not funding_df1.empty:
-                            funding_rate1 = funding_df1.iloc[-1]['fundingRate']
-                    except Exception as e:
-                        logging.error(f"Error getting funding rate for {token} on {exchange1}: {e}")
-                    
-                    try:
-                        funding_df2 = client.get_funding_rate_history(exchange2, token, days=1)
-                        if not funding_df2.empty:
-                            funding_rate2 = funding_df2.iloc[-1]['fundingRate']
-                    except Exception as e:
-                        logging.error(f"Error getting funding rate for {token} on {exchange2}: {e}")
-                    
-                    funding_spread = abs(funding_rate1 - funding_rate2)
-                    funding_spread_bps = funding_spread * 10000  # Convert to basis points
-                    
-                    arb_opportunities.append({
-                        'Token': token,
-                        'Exchange Pair': f"{exchange1.capitalize()} - {exchange2.capitalize()}",
-                        'Price Spread': f"{price_spread_bps:.1f} bps",
-                        'Funding Rate Spread': f"{funding_spread_bps:.1f} bps"
-                    })
+    for token, exchange_data in arb_tokens.items():
+        exchanges = list(exchange_data.keys())
+        prices = np.array([exchange_data[exchange]['current_price'] for exchange in exchanges], dtype=float)
+        rates = np.array([latest_rates[(exchange, token)] for exchange in exchanges], dtype=float)
+        
+        pairs = list(itertools.combinations(range(len(exchanges)), 2))
+        first, second = np.array(pairs).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Convert to basis points
+            price_spread_bps = np.abs(prices[first] - prices[second]) / np.minimum(prices[first], prices[second]) * 10000
+        funding_spread_bps = np.abs(rates[first] - rates[second]) * 10000
+        
+        for (i, j), price_bps, funding_bps in zip(pairs, price_spread_bps, funding_spread_bps):
+            arb_opportunities.append({
+                'Token': token,
+                'Exchange Pair': f"{exchanges[i].capitalize()} - {exchanges[j].capitalize()}",
+                'Price Spread': f"{price_bps:.1f} bps",
+                'Funding Rate Spread': f"{funding_bps:.1f} bps"
+            })
 
     if arb_opportunities:
         arb_df = pd.DataFrame(arb_opportunities)
@@ -614,8 +775,8 @@ def main():
         
         st.dataframe(
             top_size_df.style.apply(
-                lambda row: ['color: #2ECC71' if row['Side'] == 'LONG' else 'color: #E74C3C' for _ in row],
-                axis=1
+                color_rows_by_side,
+                axis=None
             ),
             hide_index=True,
             use_container_width=True
@@ -626,24 +787,23 @@ def main():
     # Display per-exchange metrics
     st.markdown("---")
     st.subheader("Exchange Overview")
-    exchange_metrics = {}
 
     # Calculate metrics per exchange
-    for exchange in [e.lower() for e in selected_exchanges]:
-        exchange_positions = [p for p in dashboard_data['all_positions'] if p['exchange'] == exchange]
-        total_value = sum(abs(p['size'] * p['current_price']) for p in exchange_positions)
-        exchange_delta = sum(p['size'] * p['current_price'] * (1 if p['side'].lower() == 'long' else -1) for p in exchange_positions)
-        exchange_funding = sum(p['funding_pnl'] for p in exchange_positions)
-        
-        exchange_metrics[exchange] = {
-            'total_value': total_value,
-            'delta': exchange_delta,
-            'funding_pnl': exchange_funding,
-            'position_count': len(exchange_positions)
-        }
+    if positions_df.empty:
+        exchange_metrics_df = pd.DataFrame(columns=['total_value', 'delta', 'funding_pnl', 'position_count'])
+    else:
+        exchange_metrics_df = positions_df.groupby('exchange').agg(
+            total_value=('notional', 'sum'),
+            delta=('delta', 'sum'),
+            funding_pnl=('funding_pnl', 'sum'),
+            position_count=('symbol', 'count')
+        )
+    exchange_metrics = exchange_metrics_df.reindex(
+        exchanges_lc, fill_value=0
+    ).to_dict('index')
 
     # Display exchange metrics vertically with metrics side by side
-    for exchange in [e.lower() for e in selected_exchanges]:
+    for exchange in exchanges_lc:
         st.markdown(f'<div class="exchange-section">', unsafe_allow_html=True)
         st.markdown(f"### {exchange.capitalize()}")
         metrics = exchange_metrics[exchange]
@@ -665,8 +825,8 @@ def main():
             st.metric("", metrics['position_count'])
         
         # Display positions table for this exchange
-        if exchange_positions := [p for p in dashboard_data['all_positions'] if p['exchange'] == exchange]:
-            positions_df = pd.DataFrame([{
+        if (exchange_positions := positions_by_exchange.get(exchange)) is not None:
+            table_df = pd.DataFrame([{
                 'Token': p['symbol'],
                 'Side': p['side'].upper(),
                 'Size': f"{p['size']} {p['symbol']}",
@@ -674,13 +834,13 @@ def main():
                 'Current Price': f"${p['current_price']:,.2f}",
                 'PnL': f"${p['pnl']:,.2f}",
                 'Funding PnL': f"${p['funding_pnl']:,.2f}"
-            } for p in exchange_positions])
+            } for p in exchange_positions.to_dict('records')])
             
             st.markdown(f"#### Active Positions on {exchange.capitalize()}")
             st.dataframe(
-                positions_df.style.apply(
-                    lambda row: ['color: #2ECC71' if row['Side'] == 'LONG' else 'color: #E74C3C' for _ in row],
-                    axis=1
+                table_df.style.apply(
+                    color_rows_by_side,
+                    axis=None
                 ),
                 column_config={
                     "Token": st.column_config.TextColumn("Token", width="medium"),
@@ -704,84 +864,37 @@ def main():
     # Display Funding Rate Charts for Active Positions
     st.header("📈 Funding Rate History")
 
-    # Get active positions for each exchange
-    for exchange in [e.lower() for e in selected_exchanges]:
-        exchange_positions = [p for p in dashboard_data['all_positions'] if p['exchange'] == exchange]
-        if exchange_positions:
-            st.subheader(f"{exchange.capitalize()} Funding Rates")
-            
+    # Lay out a section per exchange up front so charts can be filled in
+    # as soon as they are ready, while keeping the exchange order on the page
+    chart_sections = {}
+    for exchange in exchanges_lc:
+        exchange_positions = positions_by_exchange.get(exchange)
+        if exchange_positions is not None:
+            section = st.container()
+            section.subheader(f"{exchange.capitalize()} Funding Rates")
             # Get symbols from active positions
-            active_symbols = [p['raw_symbol'] for p in exchange_positions]
-            
-            # Get funding rate history for each symbol
-            for symbol in active_symbols:
-                try:
-                    funding_history = client.get_funding_rate_history(exchange, symbol, days)
-                    if not funding_history.empty:
-                        # Determine the correct column names based on the exchange
-                        time_col = 'fundingTime'
-                        if 'fundingRateTimestamp' in funding_history.columns:
-                            time_col = 'fundingRateTimestamp'
-                        
-                        # Create funding rate chart
-                        fig = px.line(
-                            funding_history,
-                            x=time_col,
-                            y='fundingRate',
-                            title=f"{symbol} Funding Rate",
-                            labels={'fundingRate': 'Funding Rate (%)', time_col: 'Time'},
-                        )
-                        
-                        # Customize the chart
-                        fig.update_traces(mode='lines+markers')
-                        fig.update_layout(
-                            yaxis=dict(
-                                tickformat='.4%',
-                                title='Funding Rate'
-                            ),
-                            xaxis=dict(
-                                title='Time'
-                            ),
-                            showlegend=False
-                        )
-                        
-                        # Add horizontal line at y=0
-                        fig.add_hline(
-                            y=0,
-                            line_dash="dash",
-                            line_color="gray",
-                            opacity=0.5
-                        )
-                        
-                        # Color positive rates green and negative rates red
-                        fig.update_traces(
-                            line=dict(
-                                color='#2ECC71',
-                                width=2
-                            ),
-                            marker=dict(
-                                color=funding_history['fundingRate'].apply(
-                                    lambda x: '#2ECC71' if x >= 0 else '#E74C3C'
-                                )
-                            )
-                        )
-                        
-                        st.plotly_chart(fig, use_container_width=True)
-                    else:
-                        st.info(f"No funding rate data available for {symbol}")
-                except Exception as e:
-                    st.error(f"Error fetching funding rates for {symbol}: {str(e)}")
+            chart_sections[exchange] = (section, tuple(sorted(set(exchange_positions['raw_symbol']))))
         else:
             st.info(f"No active positions on {exchange.capitalize()}")
-
-    # Auto-refresh logic with cleanup
-    if auto_refresh:
-        time.sleep(refresh_interval)
-        # Clean up before refresh
-        if 'client' in st.session_state:
-            del st.session_state.client
-        gc.collect()
-        st.rerun()
+    
+    # Build the charts for all exchanges concurrently and render each as it completes
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {
+            executor.submit(build_funding_chart, exchange, active_symbols, days): exchange
+            for exchange, (_, active_symbols) in chart_sections.items()
+        }
+        for future in as_completed(futures):
+            section = chart_sections[futures[future]][0]
+            chart_json, missing_symbols, errors = future.result()
+            for symbol in missing_symbols:
+                section.info(f"No funding rate data available for {symbol}")
+            for error in errors:
+                section.error(error)
+            
+            if chart_json is not None:
+                section.plotly_chart(go.Figure(json.loads(chart_json)), use_container_width=True)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # Auto-refresh re-runs only the dashboard body as a fragment, so the
+    # script thread isn't blocked sleeping between refreshes
+    st.fragment(main, run_every=refresh_interval if auto_refresh else None)() 
\ No newline at end of file
@@ -2,6 +2,10 @@ import streamlit as st
 from typing import Dict
 
 def render_balance_metrics(balances: Dict[str, Dict]):
+    if not balances:
+        st.info("No balance data - Configure API keys")
+        return
+
     # Create columns for each exchange
     cols = st.columns(3)
 
@@ -14,7 +18,8 @@ def render_balance_metrics(balances: Dict[str, Dict]):
             balance = balances.get(exchange, {})
 
             # Get USDT balance
-            usdt_balance = balance.get('currencies', {}).get('USDT', 0)
+            currencies = balance.get('currencies') or {}
+            usdt_balance = currencies.get('USDT', 0)
 
             # Display USDT balance
             st.metric(
@@ -1,9 +1,36 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import asyncio
+import logging
 import plotly.express as px
 from .exchange_client import ExchangeClient
 from .data_processor import DataProcessor
 
+logger = logging.getLogger(__name__)
+
+async def gather_positions(exchange_client: ExchangeClient, exchanges):
+    """Fetch positions for several exchanges concurrently.
+
+    Args:
+        exchange_client: The exchange client to fetch positions with.
+        exchanges: Names of the exchanges to fetch.
+
+    Returns:
+        dict: Positions keyed by exchange name, empty for failed exchanges.
+    """
+    results = await asyncio.gather(
+        *(asyncio.to_thread(exchange_client.get_positions, exchange) for exchange in exchanges),
+        return_exceptions=True
+    )
+    positions_by_ex = {}
+    for exchange, positions in zip(exchanges, results):
+        if isinstance(positions, Exception):
+            logger.warning(f"Error fetching {exchange} positions: {str(positions)}")
+            positions = []
+        positions_by_ex[exchange] = positions
+    return positions_by_ex
+
 def display_funding_rates(exchange_client: ExchangeClient):
     """Display funding rate payments for open positions"""
     # Initialize variables
@@ -11,25 +38,6 @@ def display_funding_rates(exchange_client: ExchangeClient):
     selected_exchange = "bybit"  # Default value
     data_processor = DataProcessor()
     
-    # Add custom CSS for smaller font in multi-select
-    st.markdown("""
-        <style>
-        .stMultiSelect div div div div div {
-            font-size: 0.8rem;
-        }
-        .stMultiSelect div div div div {
-            font-size: 0.8rem;
-        }
-        .stMultiSelect div div div {
-            font-size: 0.8rem;
-        }
-        .summary-metric {
-            font-size: 1.2rem;
-            margin-bottom: 1rem;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-    
     st.subheader("📊 Funding Rate Dashboard")
     
     # Add time period selector
@@ -57,8 +65,9 @@ def display_funding_rates(exchange_client: ExchangeClient):
             help="Select the exchange to view funding payments for"
         )
 
-    # Get positions and calculate funding payments for selected exchange
-    positions = exchange_client.get_positions(selected_exchange)
+    # Get positions for all exchanges at once and calculate funding payments for selected exchange
+    positions_by_ex = exchange_client._run_async(gather_positions(exchange_client, exchanges))
+    positions = positions_by_ex[selected_exchange]
     funding_payments = exchange_client.calculate_funding_payments(selected_exchange, days)
     
     if positions and funding_payments:
@@ -68,27 +77,20 @@ def display_funding_rates(exchange_client: ExchangeClient):
         daily_funding = total_funding / days
         
         # Calculate delta exposure by token using the existing positions data
-        delta_exposure = {}
-        
-        # First get Bybit positions
-        bybit_positions = exchange_client.get_positions('bybit')
-        for pos in bybit_positions:
-            normalized_symbol = data_processor.normalize_symbol(pos['symbol'])
-            delta = pos['size'] * pos['current_price'] * (1 if pos['side'].lower() == 'long' else -1)
-            if normalized_symbol not in delta_exposure:
-                delta_exposure[normalized_symbol] = {'total_delta': 0, 'exchanges': {'bybit': 0, 'binance': 0}}
-            delta_exposure[normalized_symbol]['total_delta'] += delta
-            delta_exposure[normalized_symbol]['exchanges']['bybit'] = delta
-        
-        # Then get Binance positions
-        binance_positions = exchange_client.get_positions('binance')
-        for pos in binance_positions:
-            normalized_symbol = data_processor.normalize_symbol(pos['symbol'])
-            delta = pos['size'] * pos['current_price'] * (1 if pos['side'].lower() == 'long' else -1)
-            if normalized_symbol not in delta_exposure:
-                delta_exposure[normalized_symbol] = {'total_delta': 0, 'exchanges': {'bybit': 0, 'binance': 0}}
-            delta_exposure[normalized_symbol]['total_delta'] += delta
-            delta_exposure[normalized_symbol]['exchanges']['binance'] = delta
+        pos_df = pd.concat(
+            [pd.DataFrame(positions_by_ex[exchange]).assign(exchange=exchange)
+             for exchange in ['bybit', 'binance'] if positions_by_ex[exchange]],
+            ignore_index=True
+        )
+        pos_df['symbol'] = pos_df['symbol'].map(data_processor.normalize_symbol)
+        pos_df['delta'] = (
+            pos_df['size'] * pos_df['current_price']
+            * np.where(pos_df['side'].str.lower() == 'long', 1, -1)
+        )
+        delta_exposure = pos_df.pivot_table(
+            index='symbol', columns='exchange', values='delta', aggfunc='sum', fill_value=0
+        ).reindex(columns=['bybit', 'binance'], fill_value=0)
+        delta_exposure['total_delta'] = delta_exposure.sum(axis=1)
         
         # Display summary section at the top
         st.markdown("### 📈 Summary")
@@ -109,7 +111,7 @@ def display_funding_rates(exchange_client: ExchangeClient):
                 help="Total funding payments received/paid"
             )
         with col3:
-            net_delta = sum(data['total_delta'] for data in delta_exposure.values())
+            net_delta = delta_exposure['total_delta'].sum()
             st.metric(
                 "Net Delta Exposure",
                 f"${net_delta:,.2f}",
@@ -119,21 +121,15 @@ def display_funding_rates(exchange_client: ExchangeClient):
         # Display Delta Exposure Section
         st.markdown("### 🎯 Delta Exposure")
         
-        # Create delta exposure table data first
-        delta_data = []
-        total_delta = 0
-        for symbol, data in delta_exposure.items():
-            row = {
-                'Token': symbol,
-                'Total Delta': f"${data['total_delta']:,.2f}",
-                'Bybit Delta': f"${data['exchanges']['bybit']:,.2f}",
-                'Binance Delta': f"${data['exchanges']['binance']:,.2f}"
-            }
-            delta_data.append(row)
-            total_delta += data['total_delta']
-        
-        # Sort by absolute total delta
-        delta_data.sort(key=lambda x: abs(float(x['Total Delta'].replace('$', '').replace(',', ''))), reverse=True)
+        # Create delta exposure table data first, sorted by absolute total delta.
+        # Values stay numeric and are formatted by the table's column config
+        total_delta = net_delta
+        delta_df = (
+            delta_exposure.sort_values('total_delta', key=abs, ascending=False)[['total_delta', 'bybit', 'binance']]
+            .rename(columns={'total_delta': 'Total Delta', 'bybit': 'Bybit Delta', 'binance': 'Binance Delta'})
+            .rename_axis('Token')
+            .reset_index()
+        )
         
         # Display total delta prominently above the table
         st.metric(
@@ -146,43 +142,35 @@ def display_funding_rates(exchange_client: ExchangeClient):
         st.markdown("<br>", unsafe_allow_html=True)
         
         # Display delta table
-        delta_df = pd.DataFrame(delta_data)
         st.dataframe(
             delta_df,
             column_config={
                 "Token": st.column_config.TextColumn("Token", width="medium"),
-                "Total Delta": st.column_config.TextColumn("Total Delta", width="medium", help="Net delta exposure across all exchanges"),
-                "Bybit Delta": st.column_config.TextColumn("Bybit Delta", width="medium", help="Delta exposure on Bybit"),
-                "Binance Delta": st.column_config.TextColumn("Binance Delta", width="medium", help="Delta exposure on Binance")
+                "Total Delta": st.column_config.NumberColumn("Total Delta", format="$%.2f", width="medium", help="Net delta exposure across all exchanges"),
+                "Bybit Delta": st.column_config.NumberColumn("Bybit Delta", format="$%.2f", width="medium", help="Delta exposure on Bybit"),
+                "Binance Delta": st.column_config.NumberColumn("Binance Delta", format="$%.2f", width="medium", help="Delta exposure on Binance")
             },
             hide_index=True,
         )
         
         st.markdown("---")
         
-        # Calculate per-token metrics
-        token_metrics = []
-        for pos in positions:
-            normalized_symbol = data_processor.normalize_symbol(pos['symbol'])
-            notional_size = abs(pos['size'] * pos['current_price'])
-            funding_pnl = funding_payments.get(pos['symbol'], 0)
-            if funding_pnl != 0:  # Avoid division by zero
-                funding_apy = (funding_pnl / notional_size * (365 / days)) * 100
-            else:
-                funding_apy = 0
-            
-            token_metrics.append({
-                'symbol': normalized_symbol,
-                'original_symbol': pos['symbol'],
-                'notional_size': notional_size,
-                'funding_pnl': funding_pnl,
-                'funding_apy': funding_apy,
-                'side': pos['side'].upper()
-            })
+        # Calculate per-token metrics in one vectorized pass
+        positions_frame = pd.DataFrame(positions)
+        notional_size = (positions_frame['size'] * positions_frame['current_price']).abs()
+        funding_pnl = positions_frame['symbol'].map(funding_payments).fillna(0.0)
+        token_metrics = pd.DataFrame({
+            'symbol': positions_frame['symbol'].map(data_processor.normalize_symbol),
+            'original_symbol': positions_frame['symbol'],
+            'notional_size': notional_size,
+            'funding_pnl': funding_pnl,
+            'funding_apy': np.where(funding_pnl != 0, funding_pnl / notional_size * (365 / days) * 100, 0),
+            'side': positions_frame['side'].str.upper()
+        })
         
-        # Sort tokens by various metrics
-        tokens_by_size = sorted(token_metrics, key=lambda x: abs(x['notional_size']), reverse=True)
-        tokens_by_funding = sorted(token_metrics, key=lambda x: x['funding_pnl'], reverse=True)
+        # Pick the top tokens by various metrics without fully sorting
+        tokens_by_size = token_metrics.nlargest(5, 'notional_size')
+        tokens_by_funding = token_metrics.nlargest(5, 'funding_pnl')
         
         st.subheader("💼 Active Positions")
         
@@ -192,46 +180,65 @@ def display_funding_rates(exchange_client: ExchangeClient):
             st.markdown("#### 🔝 Top Positions by Size")
             # Get current funding rates for each token
             current_rates = {}
-            for t in tokens_by_size[:5]:
-                funding_history = exchange_client.get_funding_rate_history(selected_exchange, t['original_symbol'], 1)
+            latest_histories = exchange_client._run_async(exchange_client.get_funding_rate_history_batch(
+                selected_exchange, tokens_by_size['original_symbol'].tolist(), 1
+            ))
+            for symbol, original_symbol in zip(tokens_by_size['symbol'], tokens_by_size['original_symbol']):
+                funding_history = latest_histories[original_symbol]
                 if not funding_history.empty:
-                    current_rates[t['symbol']] = funding_history['fundingRate'].iloc[0] * 100  # Convert to percentage
+                    current_rates[symbol] = funding_history['fundingRate'].iloc[0] * 100  # Convert to percentage
             
-            top_size_df = pd.DataFrame([{
-                'Token': t['symbol'],
-                'Side': t['side'],
-                'Size': f"${t['notional_size']:,.0f}",
-                'Current Rate': f"{current_rates.get(t['symbol'], 0):.4f}%"
-            } for t in tokens_by_size[:5]])
-            st.dataframe(top_size_df, hide_index=True)
+            top_size_df = pd.DataFrame({
+                'Token': tokens_by_size['symbol'],
+                'Side': tokens_by_size['side'],
+                'Size': tokens_by_size['notional_size'],
+                'Current Rate': tokens_by_size['symbol'].map(current_rates).fillna(0.0)
+            })
+            st.dataframe(
+                top_size_df,
+                column_config={
+                    "Size": st.column_config.NumberColumn("Size", format="$%.0f"),
+                    "Current Rate": st.column_config.NumberColumn("Current Rate", format="%.4f%%")
+                },
+                hide_index=True,
+            )
         
         with col2:
             st.markdown("#### 💰 Top Funding Earners/Payers")
             # Reuse current funding rates for top funding earners
-            top_funding_df = pd.DataFrame([{
-                'Token': t['symbol'],
-                'Funding PnL': f"${t['funding_pnl']:,.2f}",
-                'Current Rate': f"{current_rates.get(t['symbol'], 0):.4f}%"
-            } for t in tokens_by_funding[:5]])
-            st.dataframe(top_funding_df, hide_index=True)
+            top_funding_df = pd.DataFrame({
+                'Token': tokens_by_funding['symbol'],
+                'Funding PnL': tokens_by_funding['funding_pnl'],
+                'Current Rate': tokens_by_funding['symbol'].map(current_rates).fillna(0.0)
+            })
+            st.dataframe(
+                top_funding_df,
+                column_config={
+                    "Funding PnL": st.column_config.NumberColumn("Funding PnL", format="$%.2f"),
+                    "Current Rate": st.column_config.NumberColumn("Current Rate", format="%.4f%%")
+                },
+                hide_index=True,
+            )
         
         st.markdown("---")
         
         # Create a DataFrame for better display
         data = []
+        pos_by_symbol = {}
+        for pos in positions:
+            pos_by_symbol.setdefault(pos['symbol'], pos)
         for symbol, payment in funding_payments.items():
             # Get position details for this symbol
-            positions = [p for p in exchange_client.get_positions(selected_exchange) if p['symbol'] == symbol]
-            if positions:
-                position = positions[0]
+            position = pos_by_symbol.get(symbol)
+            if position:
                 normalized_symbol = data_processor.normalize_symbol(symbol)
                 data.append({
                     "Token": normalized_symbol,
                     "Position Size": f"{position['size']} {normalized_symbol}",
                     "Side": position['side'].upper(),
-                    "Entry Price": f"${position['entry_price']}",
-                    "Funding Payment": f"${payment:,.4f}",
-                    "Payment (bps)": f"{(payment / (position['size'] * position['entry_price']) * 10000):,.2f}"
+                    "Entry Price": position['entry_price'],
+                    "Funding Payment": payment,
+                    "Payment (bps)": payment / (position['size'] * position['entry_price']) * 10000
                 })
         
         if data:
@@ -244,9 +251,9 @@ def display_funding_rates(exchange_client: ExchangeClient):
                     "Token": st.column_config.TextColumn("Token", width="medium"),
                     "Position Size": st.column_config.TextColumn("Position Size", width="medium"),
                     "Side": st.column_config.TextColumn("Side", width="small"),
-                    "Entry Price": st.column_config.TextColumn("Entry Price", width="medium"),
-                    "Funding Payment": st.column_config.TextColumn("Funding Payment", width="medium"),
-                    "Payment (bps)": st.column_config.TextColumn("Payment (bps)", width="medium", help="Payment as basis points of position value")
+                    "Entry Price": st.column_config.NumberColumn("Entry Price", format="$%.4f", width="medium"),
+                    "Funding Payment": st.column_config.NumberColumn("Funding Payment", format="$%.4f", width="medium"),
+                    "Payment (bps)": st.column_config.NumberColumn("Payment (bps)", format="%.2f", width="medium", help="Payment as basis points of position value")
                 },
                 hide_index=True,
             )
@@ -254,19 +261,16 @@ def display_funding_rates(exchange_client: ExchangeClient):
             # Add funding rate history chart
             st.subheader("Funding Rate History")
             
-            # Get all tokens with funding rate history
-            all_tokens = set()
-            
-            # Get funding history for both exchanges
-            for exchange in ['bybit', 'binance']:
-                # Get all symbols from the exchange
-                exchange_positions = exchange_client.get_positions(exchange)
-                for pos in exchange_positions:
-                    normalized_symbol = data_processor.normalize_symbol(pos['symbol'])
-                    all_tokens.add(normalized_symbol)
+            # Map normalized tokens to original symbols for both exchanges; the
+            # charts reuse these maps instead of normalizing the positions again
+            symbol_maps = {
+                exchange: {data_processor.normalize_symbol(pos['symbol']): pos['symbol']
+                           for pos in positions_by_ex[exchange]}
+                for exchange in ['bybit', 'binance']
+            }
             
             # Sort tokens alphabetically
-            available_tokens = sorted(all_tokens)
+            available_tokens = sorted(set().union(*symbol_maps.values()))
             
             # Add token selector
             selected_tokens = st.multiselect(
@@ -276,80 +280,92 @@ def display_funding_rates(exchange_client: ExchangeClient):
                 help="Choose which tokens to show on the charts"
             )
             
-            if selected_tokens:
-                # Create a color map for consistent colors across charts
+            # Stop before building the color map or fetching any chart data
+            if not selected_tokens:
+                st.warning("Please select at least one token to display.")
+                return
+            
+            # Create a color map for consistent colors across charts, rebuilt only
+            # when the available tokens change
+            color_map_key = tuple(available_tokens)
+            if st.session_state.get('color_map_key') != color_map_key:
                 color_sequence = px.colors.qualitative.Set1
-                color_map = {token: color_sequence[i % len(color_sequence)] 
-                           for i, token in enumerate(available_tokens)}
+                st.session_state.color_map = {token: color_sequence[i % len(color_sequence)]
+                                              for i, token in enumerate(available_tokens)}
+                st.session_state.color_map_key = color_map_key
+            color_map = st.session_state.color_map
+            
+            # Function to create and display funding rate chart
+            def display_exchange_funding_chart(exchange):
+                all_funding_rates = []
+                symbol_map = symbol_maps[exchange]
                 
-                # Function to create and display funding rate chart
-                def display_exchange_funding_chart(exchange):
-                    all_funding_rates = []
-                    exchange_positions = exchange_client.get_positions(exchange)
-                    symbol_map = {data_processor.normalize_symbol(pos['symbol']): pos['symbol'] 
-                                for pos in exchange_positions}
-                    
-                    for normalized_symbol in selected_tokens:
-                        # Get the original symbol for this token
-                        original_symbol = symbol_map.get(normalized_symbol)
-                        if original_symbol:
-                            funding_history = exchange_client.get_funding_rate_history(exchange, original_symbol, days)
-                            if not funding_history.empty:
-                                time_col = 'fundingRateTimestamp' if 'fundingRateTimestamp' in funding_history.columns else 'fundingTime'
-                                funding_history['symbol'] = normalized_symbol  # Use normalized symbol for display
-                                funding_history['fundingRate'] = funding_history['fundingRate'] * 100  # Convert to percentage
-                                funding_history = funding_history[[time_col, 'fundingRate', 'symbol']]
-                                all_funding_rates.append(funding_history)
-                    
-                    if all_funding_rates:
-                        # Combine all funding rates into a single DataFrame
-                        combined_df = pd.concat(all_funding_rates, ignore_index=True)
-                        time_col = 'fundingRateTimestamp' if 'fundingRateTimestamp' in combined_df.columns else 'fundingTime'
-                        
-                        # Create scatter plot using Plotly
-                        fig = px.scatter(
-                            combined_df,
-                            x=time_col,
-                            y='fundingRate',
-                            color='symbol',
-                            title=f'Funding Rates History - {exchange.capitalize()}',
-                            labels={
-                                time_col: 'Time',
-                                'fundingRate': 'Funding Rate (%)',
-                                'symbol': 'Token'
-                            },
-                            color_discrete_map=color_map  # Use consistent colors
-                        )
-                        
-                        # Update layout for better readability
-                        fig.update_layout(
-                            xaxis_title='Time',
-                            yaxis_title='Funding Rate (%)',
-                            legend_title='Token',
-                            hovermode='x unified',
-                            height=400,  # Fixed height for consistency
-                            showlegend=True,  # Always show legend for consistency
-                            yaxis_range=[
-                                combined_df['fundingRate'].min() * 1.1 if combined_df['fundingRate'].min() < 0 else combined_df['fundingRate'].min() * 0.9,
-                                combined_df['fundingRate'].max() * 1.1 if combined_df['fundingRate'].max() > 0 else combined_df['fundingRate'].max() * 0.9
-                            ]  # Consistent y-axis range with some padding
-                        )
-                        
-                        # Add lines connecting points for each symbol
-                        fig.update_traces(mode='lines+markers')
-                        
-                        # Display the plot
-                        st.plotly_chart(fig, use_container_width=True)
-                    else:
-                        st.info(f"No funding rate data available for {exchange.capitalize()}")
+                # Get the original symbols for the selected tokens and fetch them concurrently
+                selected_symbols = {normalized_symbol: symbol_map[normalized_symbol]
+                                    for normalized_symbol in selected_tokens if normalized_symbol in symbol_map}
+                histories = exchange_client._run_async(exchange_client.get_funding_rate_history_batch(
+                    exchange, list(selected_symbols.values()), days
+                ))
                 
-                # Display charts one below the other
-                st.markdown("#### Bybit Funding Rates")
-                display_exchange_funding_chart("bybit")
+                for normalized_symbol, original_symbol in selected_symbols.items():
+                    funding_history = histories[original_symbol]
+                    if not funding_history.empty:
+                        # Subset before adding columns so the wide frame isn't copied
+                        funding_history = funding_history[['fundingTime', 'fundingRate']].assign(
+                            fundingRate=funding_history['fundingRate'] * 100,  # Convert to percentage
+                            symbol=normalized_symbol  # Use normalized symbol for display
+                        )
+                        all_funding_rates.append(funding_history)
                 
-                st.markdown("#### Binance Funding Rates")
-                display_exchange_funding_chart("binance")
-            else:
-                st.warning("Please select at least one token to display.")
+                if all_funding_rates:
+                    # Combine all funding rates into a single DataFrame
+                    combined_df = pd.concat(all_funding_rates, ignore_index=True, copy=False)
+                    
+                    # Pad the y-axis range, reading the rate extremes once
+                    rates = combined_df['fundingRate'].to_numpy()
+                    rate_min, rate_max = rates.min(), rates.max()
+                    rate_min = rate_min * 1.1 if rate_min < 0 else rate_min * 0.9
+                    rate_max = rate_max * 1.1 if rate_max > 0 else rate_max * 0.9
+                    
+                    # Create scatter plot using Plotly
+                    fig = px.scatter(
+                        combined_df,
+                        x='fundingTime',
+                        y='fundingRate',
+                        color='symbol',
+                        title=f'Funding Rates History - {exchange.capitalize()}',
+                        labels={
+                            'fundingTime': 'Time',
+                            'fundingRate': 'Funding Rate (%)',
+                            'symbol': 'Token'
+                        },
+                        color_discrete_map=color_map  # Use consistent colors
+                    )
+                    
+                    # Update layout for better readability
+                    fig.update_layout(
+                        xaxis_title='Time',
+                        yaxis_title='Funding Rate (%)',
+                        legend_title='Token',
+                        hovermode='x unified',
+                        height=400,  # Fixed height for consistency
+                        showlegend=True,  # Always show legend for consistency
+                        yaxis_range=[rate_min, rate_max]  # Consistent y-axis range with some padding
+                    )
+                    
+                    # Add lines connecting points for each symbol
+                    fig.update_traces(mode='lines+markers')
+                    
+                    # Display the plot
+                    st.plotly_chart(fig, use_container_width=True)
+                else:
+                    st.info(f"No funding rate data available for {exchange.capitalize()}")
+            
+            # Display charts one below the other
+            st.markdown("#### Bybit Funding Rates")
+            display_exchange_funding_chart("bybit")
+            
+            st.markdown("#### Binance Funding Rates")
+            display_exchange_funding_chart("binance")
     else:
         st.info("No open positions found with funding payments.") 
\ No newline at end of file
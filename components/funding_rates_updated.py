@@ -1,131 +1,390 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from utils.exchange_client import ExchangeClient
+import numpy as np
+import plotly.graph_objects as go
+from utils.exchange_client import ExchangeClient, get_exchange_client
 from utils.data_processor import DataProcessor
-import gc
+import hashlib
+import json
 import logging
+import math
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache, partial
+from types import MappingProxyType
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+logger = logging.getLogger(__name__)
 
 # Initialize DataProcessor
 data_processor = DataProcessor()
 
-# Don't initialize client at module level - move to function
-# client = st.session_state.client if 'client' in st.session_state else ExchangeClient()
+# Funding interval in hours by exchange (get_funding_interval is not implemented)
+FUNDING_INTERVAL_HOURS = MappingProxyType({
+    'hyperliquid': 1,
+    'bybit': 8,
+    'binance': 8,
+    'okx': 8,
+    'rabbitx': 1
+})
 
-# Cache the funding rate history data
-@st.cache_data(ttl=300, max_entries=100)  # Cache for 5 minutes, limit entries
-def get_cached_funding_history(exchange: str, symbol: str, days: int, start_time: int = None, end_time: int = None):
-    """Cached wrapper for funding rate history"""
-    try:
-        # Get client from session state inside the function
-        client = st.session_state.client if 'client' in st.session_state else ExchangeClient()
+# Milliseconds in a day, for converting between day counts and epoch timestamps
+DAY_MS = 86400 * 1000
+
+# Maximum points plotted per token in the funding rate charts
+MAX_CHART_POINTS = 500
+
+# Exchanges shown on the dashboard, in display order
+EXCHANGES = ('bybit', 'binance', 'okx', 'hyperliquid', 'rabbitx')
+
+# Credential fields without which an exchange's positions cannot be fetched
+REQUIRED_CREDENTIALS = MappingProxyType({
+    'hyperliquid': ('api_key', 'secret'),
+    'rabbitx': ('api_key', 'secret', 'jwt_token')
+})
+
+def _has_credentials(credentials: dict, exchange: str) -> bool:
+    """Check whether an exchange has the credentials it requires.
+    
+    Args:
+        credentials (dict): Credentials by exchange name
+        exchange (str): Exchange name
         
-        # Get RabbitX credentials from session state
-        rabbitx_creds = st.session_state.exchange_credentials.get('rabbitx', {})
+    Returns:
+        bool: True if every required credential field is set
+    """
+    creds = credentials.get(exchange) or {}
+    return all(creds.get(field) for field in REQUIRED_CREDENTIALS.get(exchange, ()))
+
+def credentials_digest(creds: dict) -> str:
+    """Get a short stable digest of credentials for use in cache keys.
+    
+    Args:
+        creds (dict): The credentials to digest
         
-        # Ensure Hyperliquid credentials are set
-        if exchange == 'hyperliquid':
-            hyperliquid_wallet = st.session_state.exchange_credentials.get('hyperliquid', {}).get('api_key', "")
-            hyperliquid_key = st.session_state.exchange_credentials.get('hyperliquid', {}).get('secret', "")
-            
-            if hyperliquid_wallet and hyperliquid_key:
-                client._hyperliquid_api_key = hyperliquid_wallet
-                client._hyperliquid_secret = hyperliquid_key
-                print(f"Set Hyperliquid credentials for funding history fetch")
-        elif exchange == 'rabbitx':
-            rabbitx_creds = st.session_state.exchange_credentials.get('rabbitx', {})
-            client._rabbitx_api_key = rabbitx_creds.get('api_key', "")
-            client._rabbitx_secret = rabbitx_creds.get('secret', "")
-            client._rabbitx_jwt_token = rabbitx_creds.get('jwt_token', "")
-        elif exchange == 'bybit':
-            bybit_creds = st.session_state.exchange_credentials.get('bybit', {})
-            client._bybit_api_key = bybit_creds.get('api_key', "")
-            client._bybit_secret = bybit_creds.get('secret', "")
-            
-        # Ensure symbol is properly formatted for each exchange
-        if exchange == 'bybit':
-            # Bybit requires uppercase symbols without special characters
-            symbol = symbol.upper().replace('/', '').replace(':', '')
-            if not symbol.endswith('USDT'):
-                symbol = f"{symbol}USDT"
-            print(f"Using formatted Bybit symbol for funding history: {symbol}")
-        elif exchange == 'okx':
-            if not symbol.endswith('-USDT-SWAP'):
-                symbol = f"{symbol}-USDT-SWAP"
-            print(f"Using formatted OKX symbol for funding history: {symbol}")
-            
-        return client.get_funding_rate_history(exchange, symbol, days, start_time, end_time)
-    except Exception as e:
-        print(f"Error in get_cached_funding_history for {exchange} {symbol}: {str(e)}")
-        return pd.DataFrame()
+    Returns:
+        str: The first 16 hex characters of the credentials' SHA-256
+    """
+    return hashlib.sha256(json.dumps(creds, sort_keys=True).encode()).hexdigest()[:16]
 
-# Cache position data
-@st.cache_data(ttl=60, max_entries=50)  # Cache for 1 minute, limit entries
-def get_cached_positions(exchange: str):
-    """Cached wrapper for positions"""
+def _exchange_credentials(exchange: str):
+    """Get an exchange's credentials from session state with a short digest.
     
-    # Get client from session state inside the function
-    client = st.session_state.client if 'client' in st.session_state else ExchangeClient()
+    The digest is passed to the cached wrappers so that changed credentials
+    miss the cache, while the credentials themselves are not hashed.
+    
+    Args:
+        exchange (str): Exchange name
+        
+    Returns:
+        tuple: The credentials dict and its digest
+    """
+    creds = dict(st.session_state.exchange_credentials.get(exchange, {}))
+    return creds, credentials_digest(creds)
+
+def _apply_credentials(client: ExchangeClient, exchange: str, creds: dict, required: bool = False):
+    """Set an exchange's credentials on the client.
     
-    # Ensure Hyperliquid credentials are set
+    Args:
+        client (ExchangeClient): The client to configure
+        exchange (str): Exchange name
+        creds (dict): The exchange's credentials
+        required (bool): Whether missing Hyperliquid/RabbitX credentials are an error
+        
+    Raises:
+        ValueError: If the credentials are required but missing
+    """
     if exchange == 'hyperliquid':
-        hyperliquid_wallet = st.session_state.exchange_credentials.get('hyperliquid', {}).get('api_key')
-        hyperliquid_key = st.session_state.exchange_credentials.get('hyperliquid', {}).get('secret')
-        # Check if Hyperliquid credentials are empty when accessing Hyperliquid exchange
-        if not hyperliquid_wallet or not hyperliquid_key:
+        if creds.get('api_key') and creds.get('secret'):
+            client._hyperliquid_api_key = creds['api_key']
+            client._hyperliquid_secret = creds['secret']
+        elif required:
             raise ValueError("Hyperliquid credentials are missing. Please check your configuration.")
-        if hyperliquid_wallet and hyperliquid_key:
-            client._hyperliquid_api_key = hyperliquid_wallet
-            client._hyperliquid_secret = hyperliquid_key
-            print(f"Set Hyperliquid credentials for positions fetch")
-            print(f"Wallet Address present: {bool(hyperliquid_wallet)}")
-            print(f"Private Key present: {bool(hyperliquid_key)}")
-    
     elif exchange == 'rabbitx':
-        # Get RabbitX credentials from session state
-        rabbitx_creds = st.session_state.exchange_credentials.get('rabbitx', {})
-        # Check if RabbitX credentials are empty when accessing RabbitX exchange
-        if not rabbitx_creds.get('api_key') or not rabbitx_creds.get('secret') or not rabbitx_creds.get('jwt_token'):
+        if required and not (creds.get('api_key') and creds.get('secret') and creds.get('jwt_token')):
             raise ValueError("RabbitX credentials are missing. Please check your configuration.")
-        client._rabbitx_api_key = rabbitx_creds.get('api_key', "")
-        client._rabbitx_secret = rabbitx_creds.get('secret', "")
-        client._rabbitx_jwt_token = rabbitx_creds.get('jwt_token', "")
+        if creds:
+            client._rabbitx_api_key = creds.get('api_key', "")
+            client._rabbitx_secret = creds.get('secret', "")
+            client._rabbitx_jwt_token = creds.get('jwt_token', "")
+    elif exchange == 'bybit':
+        if creds:
+            client._bybit_api_key = creds.get('api_key', "")
+            client._bybit_secret = creds.get('secret', "")
+
+def _client_with_credentials(exchange: str, creds: dict = None, required: bool = False) -> ExchangeClient:
+    """Get the exchange client configured with the exchange's credentials.
+    
+    Credentials are read from session state when not passed in.
+    """
+    client = get_exchange_client()
+    if creds is None:
+        creds, _ = _exchange_credentials(exchange)
+    _apply_credentials(client, exchange, creds, required)
+    return client
 
-    return client.get_positions(exchange)
+@lru_cache(maxsize=4096)  # The same positions are formatted on every render
+def _format_symbol(exchange: str, raw: str, normalized: str) -> str:
+    """Format a symbol as the exchange's funding history endpoint expects it.
+    
+    Args:
+        exchange (str): Exchange name
+        raw (str): The symbol as reported by the exchange
+        normalized (str): The normalized token symbol
+        
+    Returns:
+        str: The formatted symbol
+    """
+    if exchange == 'okx':
+        if not raw.endswith('-USDT-SWAP'):
+            return f"{normalized}-USDT-SWAP"
+    elif exchange == 'bybit':
+        # Bybit requires uppercase symbols without special characters
+        raw = raw.upper().replace('/', '').replace(':', '').replace('-', '')
+        if not raw.endswith('USDT'):
+            return f"{raw}USDT"
+    elif exchange == 'binance':
+        raw = raw.upper().replace('/', '').replace(':', '')
+        if not raw.endswith('USDT'):
+            return f"{raw}USDT"
+    return raw
+
+def _thin_funding_history(exchange: str, funding_history: pd.DataFrame) -> pd.DataFrame:
+    """Reduce a funding rate history to the columns the charts use before caching it.
+    
+    Args:
+        exchange (str): Exchange name
+        funding_history (pd.DataFrame): Funding rate history as returned by the client
+        
+    Returns:
+        pd.DataFrame: Time-sorted fundingTime and fundingRate columns, with the
+            rate as a percentage and unparseable or infinite rates dropped
+    """
+    if funding_history.empty or not {'fundingTime', 'fundingRate'}.issubset(funding_history.columns):
+        return pd.DataFrame(columns=['fundingTime', 'fundingRate'])
+    
+    thin = funding_history[['fundingTime', 'fundingRate']].copy()
+    thin['fundingRate'] = pd.to_numeric(thin['fundingRate'], errors='coerce')
+    if exchange in ('bybit', 'binance'):
+        thin['fundingRate'] *= 100
+    
+    # Drop unparseable and infinite rates in one pass
+    thin['fundingRate'] = thin['fundingRate'].replace([np.inf, -np.inf], np.nan)
+    return thin.dropna(subset=['fundingRate']).sort_values('fundingTime', ignore_index=True)
+
+def _fetch_funding_history(exchange: str, symbol: str, days: int, creds: dict = None,
+                           start_time: int = None, end_time: int = None) -> pd.DataFrame:
+    """Fetch a thinned funding rate history, optionally limited to a time window.
+    
+    Args:
+        exchange (str): Exchange name
+        symbol (str): Symbol to fetch
+        days (int): Number of days of history to fetch
+        creds (dict): The exchange's credentials, read from session state if omitted
+        start_time (int): Window start in epoch milliseconds
+        end_time (int): Window end in epoch milliseconds
+        
+    Returns:
+        pd.DataFrame: The funding rate history within the window
+    """
+    client = _client_with_credentials(exchange, creds)
+    
+    # Ensure symbol is properly formatted for each exchange
+    symbol = _format_symbol(exchange, symbol, data_processor.normalize_symbol(symbol))
+    
+    # The client fetches the last `days` of history; it takes no explicit time range
+    history = _thin_funding_history(exchange, client.get_funding_rate_history(exchange, symbol, days))
+    if start_time is not None:
+        history = history[history['fundingTime'] >= pd.to_datetime(start_time, unit='ms')]
+    if end_time is not None:
+        history = history[history['fundingTime'] <= pd.to_datetime(end_time, unit='ms')]
+    return history
+
+# Cache the funding rate history data
+@st.cache_data(ttl=300, max_entries=100, show_spinner=False)  # Cache for 5 minutes, limit entries
+def get_cached_funding_history(exchange: str, symbol: str, days: int, creds_hash: str = None, _creds: dict = None,
+                               start_time: int = None, end_time: int = None):
+    """Cached wrapper for funding rate history"""
+    try:
+        return _fetch_funding_history(exchange, symbol, days, _creds, start_time, end_time)
+    except Exception as e:
+        logger.warning(f"Error in get_cached_funding_history for {exchange} {symbol}: {str(e)}")
+        return pd.DataFrame()
+
+def _fetch_bulk_funding_history(exchange: str, symbols: tuple, days: int, creds: dict = None,
+                                start_time: int = None, end_time: int = None) -> dict:
+    """Fetch thinned funding rate histories for several symbols concurrently.
+    
+    Args:
+        exchange (str): Exchange name
+        symbols (tuple): Symbols to fetch
+        days (int): Number of days of history to fetch
+        creds (dict): The exchange's credentials, read from session state if omitted
+        start_time (int): Window start in epoch milliseconds, inclusive
+        end_time (int): Window end in epoch milliseconds, exclusive
+        
+    Returns:
+        dict: Funding rate history within the window keyed by the symbols as passed in
+    """
+    client = _client_with_credentials(exchange, creds)
+    formatted = {
+        symbol: _format_symbol(exchange, symbol, data_processor.normalize_symbol(symbol))
+        for symbol in symbols
+    }
+    histories = client._run_async(
+        client.get_funding_rate_history_batch(exchange, list(formatted.values()), days, max_concurrency=8)
+    )
+    
+    bulk = {}
+    for symbol, formatted_symbol in formatted.items():
+        history = _thin_funding_history(exchange, histories[formatted_symbol])
+        if start_time is not None:
+            history = history[history['fundingTime'] >= pd.to_datetime(start_time, unit='ms')]
+        if end_time is not None:
+            history = history[history['fundingTime'] < pd.to_datetime(end_time, unit='ms')]
+        bulk[symbol] = history
+    return bulk
+
+# Cache funding rate histories for whole days that have ended
+# Persisted caches ignore TTLs, which is safe only because finished days never change
+@st.cache_data(max_entries=100, persist="disk", show_spinner=False)  # Survives restarts, limit entries
+def _cached_bulk_funding_history_closed(exchange: str, symbols: tuple, start_time: int, end_time: int,
+                                        creds_hash: str = None, _creds: dict = None):
+    """Cached wrapper for funding rate histories of a window that has already ended"""
+    # Fetch far enough back to cover the start of the window
+    days = math.ceil((time.time() * 1000 - start_time) / DAY_MS)
+    histories = _fetch_bulk_funding_history(exchange, symbols, days, _creds, start_time, end_time)
+    missing = [symbol for symbol, history in histories.items() if history.empty]
+    if missing:
+        # The client returns empty frames on errors; raising keeps them out of the persisted cache
+        raise ValueError(f"No funding history for {exchange} {', '.join(missing)} in the requested window")
+    return histories
+
+# Cache funding rate histories for windows that are still open
+@st.cache_data(ttl=300, max_entries=50, show_spinner=False)  # Cache for 5 minutes, limit entries
+def _cached_bulk_funding_history_live(exchange: str, symbols: tuple, days: int, start_time: int,
+                                      creds_hash: str = None, _creds: dict = None):
+    """Cached wrapper for funding rate histories of a window that is still open"""
+    return _fetch_bulk_funding_history(exchange, symbols, days, _creds, start_time)
+
+def get_cached_bulk_funding_history(exchange: str, symbols: tuple, days: int, creds_hash: str = None, _creds: dict = None):
+    """Get funding rate histories for several symbols over the last `days` days.
+    
+    Whole days that have ended cannot change, so they are cached on disk,
+    surviving restarts. Only the current day is refetched when its
+    five-minute cache expires. If any symbol's closed days come back empty,
+    possibly from a failed request, nothing is persisted and the whole window
+    is cached for five minutes instead.
+    
+    Args:
+        exchange (str): Exchange name
+        symbols (tuple): Symbols to fetch
+        days (int): Number of days of history to fetch
+        creds_hash (str): Digest of the exchange's credentials, part of the cache key
+        _creds (dict): The exchange's credentials, read from session state if omitted
+        
+    Returns:
+        dict: Thinned funding rate history keyed by the symbols as passed in
+    """
+    now_ms = int(time.time() * 1000)
+    today_start = now_ms - now_ms % DAY_MS
+    live_days, live_start = 1, today_start
+    try:
+        closed = _cached_bulk_funding_history_closed(
+            exchange, symbols, today_start - days * DAY_MS, today_start, creds_hash, _creds
+        )
+    except Exception as e:
+        logger.warning(f"Error in get_cached_bulk_funding_history for {exchange} closed days: {str(e)}")
+        # Nothing was persisted; fetch the whole window through the short-lived cache instead
+        closed = {}
+        live_days, live_start = days + 1, today_start - days * DAY_MS
+    try:
+        live = _cached_bulk_funding_history_live(exchange, symbols, live_days, live_start, creds_hash, _creds)
+    except Exception as e:
+        logger.warning(f"Error in get_cached_bulk_funding_history for {exchange} current day: {str(e)}")
+        live = {}
+    
+    window_start = pd.to_datetime(now_ms - days * DAY_MS, unit='ms')
+    bulk = {}
+    for symbol in symbols:
+        parts = [part[symbol] for part in (closed, live) if symbol in part and not part[symbol].empty]
+        if not parts:
+            bulk[symbol] = pd.DataFrame()
+            continue
+        history = pd.concat(parts, ignore_index=True)
+        bulk[symbol] = history[history['fundingTime'] >= window_start].reset_index(drop=True)
+    return bulk
+
+# Cache position data
+@st.cache_data(ttl=10, max_entries=50, show_spinner=False)  # Cache for 10 seconds, positions change constantly
+def get_cached_positions(exchange: str, creds_hash: str = None, _creds: dict = None):
+    """Cached wrapper for positions"""
+    client = _client_with_credentials(exchange, _creds, required=True)
+    # Bypass the client's own one-minute cache, which is not keyed on credentials
+    return client.fetch_positions(exchange)
 
 # Cache funding payments calculation
-@st.cache_data(ttl=300, max_entries=50)  # Cache for 5 minutes, limit entries
-def get_cached_funding_payments(exchange: str, days: int):
+@st.cache_data(ttl=300, max_entries=50, show_spinner=False)  # Cache for 5 minutes, limit entries
+def get_cached_funding_payments(exchange: str, days: int, creds_hash: str = None, _creds: dict = None):
     """Cached wrapper for funding payments"""
+    client = _client_with_credentials(exchange, _creds)
+    # Bypass the client's own five-minute cache, which is not keyed on credentials
+    return client.fetch_funding_payments(exchange, days)
+
+def script_executor(max_workers: int) -> ThreadPoolExecutor:
+    """Create a thread pool whose workers share the current script run context.
+
+    Streamlit's caches and session state are only fully available from threads
+    attached to the running script.
+
+    Args:
+        max_workers (int): Maximum number of worker threads
+
+    Returns:
+        ThreadPoolExecutor: The thread pool
+    """
+    return ThreadPoolExecutor(
+        max_workers=max_workers,
+        initializer=partial(add_script_run_ctx, None, get_script_run_ctx())
+    )
+
+def _fetch_exchange(exchange: str, days: int, creds: dict, creds_hash: str):
+    """Fetch positions, funding payments and chart funding histories for one exchange.
     
-    # Get client from session state inside the function
-    client = st.session_state.client if 'client' in st.session_state else ExchangeClient()
-    
-    # Ensure Hyperliquid credentials are set
-    if exchange == 'hyperliquid':
-        hyperliquid_wallet = st.session_state.exchange_credentials.get('hyperliquid', {}).get('api_key', "")
-        hyperliquid_key = st.session_state.exchange_credentials.get('hyperliquid', {}).get('secret', "")
+    Args:
+        exchange (str): Exchange name
+        days (int): Number of days to analyze
+        creds (dict): The exchange's credentials
+        creds_hash (str): Digest of the credentials for the cache keys
         
-        if hyperliquid_wallet and hyperliquid_key:
-            client._hyperliquid_api_key = hyperliquid_wallet
-            client._hyperliquid_secret = hyperliquid_key
-            print(f"Set Hyperliquid credentials for funding payments fetch")
-            print(f"Wallet Address present: {bool(hyperliquid_wallet)}")
-            print(f"Private Key present: {bool(hyperliquid_key)}")
+    Returns:
+        tuple: The exchange, its positions, its funding payments by symbol and
+            the processed funding rate history frames for the charts
+    """
+    # Get historical positions for the time period
+    positions = get_cached_positions(exchange, creds_hash, creds)
+    funding_payments = get_cached_funding_payments(exchange, days, creds_hash, creds) if positions else {}
     
-    elif exchange == 'rabbitx':
-        rabbitx_creds = st.session_state.exchange_credentials.get('rabbitx', {})
-        if rabbitx_creds:
-            client._rabbitx_api_key = rabbitx_creds.get('api_key', "")
-            client._rabbitx_secret = rabbitx_creds.get('secret', "")
-            client._rabbitx_jwt_token = rabbitx_creds.get('jwt_token', "")
-            print(f"Set RabbitX credentials for funding payments fetch")
-            print(f"API Key present: {bool(rabbitx_creds.get('api_key'))}")
-            print(f"Secret present: {bool(rabbitx_creds.get('secret'))}")
-            print(f"JWT Token present: {bool(rabbitx_creds.get('jwt_token'))}")
+    # Format symbols according to exchange requirements
+    chart_symbols = []
+    for pos in positions:
+        normalized = data_processor.normalize_symbol(pos['symbol'])
+        raw = _format_symbol(exchange, pos['symbol'], normalized)
+        chart_symbols.append((normalized, raw))
+    
+    # Get funding rate histories for all symbols in one batched call
+    histories = get_cached_bulk_funding_history(
+        exchange, tuple(raw for _, raw in chart_symbols), days, creds_hash, creds
+    )
+    
+    funding_rate_dfs = []
+    for normalized, raw in chart_symbols:
+        funding_history = histories[raw]
+        if not funding_history.empty:
+            logger.debug(f"Got funding history for {exchange} {normalized}: {len(funding_history)} entries")
+            funding_rate_dfs.append(funding_history.assign(symbol=normalized, exchange=exchange))
     
-    return client.calculate_funding_payments(exchange, days)
+    return exchange, positions, funding_payments, funding_rate_dfs
 
 def display_funding_rates(days: int):
     """Display funding rates and related information.
@@ -137,115 +396,47 @@ def display_funding_rates(days: int):
     
     # Initialize variables
     all_positions = []
-    total_exposure = 0
     total_funding = 0
     daily_funding = 0
     
     # Get all historical positions and funding payments for the selected time period
-    historical_positions = {}
     historical_funding_payments = {}
-    funding_intervals = {}  # Store funding intervals by exchange and symbol
     all_funding_rates = []
     
-    # First, get all positions and funding data
-    for exchange in ['bybit', 'binance', 'okx', 'hyperliquid', 'rabbitx']:
-        try:
-            # Get historical positions for the time period
-            positions = get_cached_positions(exchange)
-            if positions:
-                # Process positions in chunks
-                chunk_size = 50
-                for i in range(0, len(positions), chunk_size):
-                    chunk = positions[i:i + chunk_size]
-                    all_positions.extend(chunk)
-                    
-                    # Calculate metrics for this chunk
-                    total_exposure += sum(abs(pos['size'] * pos['current_price']) for pos in chunk)
-                    
-                    # Get funding payments for this chunk
-                    funding_payments = get_cached_funding_payments(exchange, days)
-                    historical_funding_payments.update(funding_payments)
-                    total_funding += sum(funding_payments.values())
-                    
-                    # Clear chunk from memory
-                    del chunk
-            
-            # Store positions for later use
-            historical_positions[exchange] = positions
-            
-            # Get funding intervals (using default values since get_funding_interval is not implemented)
-            funding_intervals[exchange] = {
-                'hyperliquid': 1,
-                'bybit': 8,
-                'binance': 8,
-                'okx': 8,
-                'rabbitx': 1
-            }.get(exchange.lower(), 8)
-            
-            # Process funding rates for charts
-            for pos in positions:
-                normalized = data_processor.normalize_symbol(pos['symbol'])
-                raw = pos['symbol']
-                # Format symbol according to exchange requirements
-                if exchange == 'okx' and not raw.endswith('-USDT-SWAP'):
-                    raw = f"{normalized}-USDT-SWAP"
-                elif exchange == 'bybit':
-                    raw = raw.upper().replace('/', '').replace(':', '').replace('-', '')
-                    if not raw.endswith('USDT'):
-                        raw = f"{raw}USDT"
-                elif exchange == 'binance':
-                    raw = raw.upper().replace('/', '').replace(':', '')
-                    if not raw.endswith('USDT'):
-                        raw = f"{raw}USDT"
-                
-                print(f"Processing funding rates for {exchange} {raw}")
-                
-                # Get funding rate history
-                end_time = int(time.time() * 1000)
-                start_time = end_time - (days * 24 * 60 * 60 * 1000)
-                
-                funding_history = get_cached_funding_history(
-                    exchange,
-                    raw,
-                    days,
-                    start_time=start_time,
-                    end_time=end_time
-                )
-                
-                if not funding_history.empty:
-                    print(f"Got funding history for {exchange} {normalized}: {len(funding_history)} entries")
-                    
-                    # Process funding history for charts
-                    if 'fundingRateTimestamp' in funding_history.columns:
-                        time_col = 'fundingRateTimestamp'
-                    elif 'fundingTime' in funding_history.columns:
-                        time_col = 'fundingTime'
-                    else:
-                        continue
-                    
-                    funding_history['symbol'] = normalized
-                    
-                    try:
-                        if 'fundingRate' in funding_history.columns:
-                            funding_history['fundingRate'] = funding_history['fundingRate'].astype(str).apply(lambda x: float(x))
-                            
-                            if exchange in ['bybit', 'binance']:
-                                funding_history['fundingRate'] = funding_history['fundingRate'] * 100
-                            
-                            funding_history = funding_history.dropna(subset=['fundingRate'])
-                            funding_history = funding_history[~funding_history['fundingRate'].isin([float('inf'), float('-inf')])]
-                            
-                            if not funding_history.empty:
-                                funding_history = funding_history.sort_values([time_col], ascending=[True])
-                                funding_history = funding_history[[time_col, 'fundingRate', 'symbol']]
-                                all_funding_rates.append(funding_history)
-                    except Exception as e:
-                        print(f"Error processing funding rates for {exchange} {normalized}: {str(e)}")
-                        continue
-                        
-        except Exception as e:
-            print(f"Error fetching historical data for {exchange}: {str(e)}")
+    # First, get all positions and funding data for every exchange concurrently
+    # Skip exchanges whose positions would fail for lack of credentials
+    exchanges = [e for e in EXCHANGES if _has_credentials(st.session_state.exchange_credentials, e)]
+    results = {}
+    # Read credentials once up front rather than from each worker
+    credentials = {exchange: _exchange_credentials(exchange) for exchange in exchanges}
+    with script_executor(max_workers=5) as pool:
+        futures = {
+            pool.submit(_fetch_exchange, exchange, days, *credentials[exchange]): exchange
+            for exchange in exchanges
+        }
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                logger.warning(f"Error fetching historical data for {futures[future]}: {str(e)}")
+    
+    # Aggregate in a fixed exchange order so the tables are stable across runs
+    for exchange in exchanges:
+        if exchange not in results:
             continue
+        _, positions, funding_payments, funding_rate_dfs = results[exchange]
+        if positions:
+            all_positions.extend(positions)
+            historical_funding_payments.update(funding_payments)
+            total_funding += sum(funding_payments.values())
+        
+        all_funding_rates.extend(funding_rate_dfs)
+
+    # Build one positions frame for the summary and per-token metrics
+    pos_df = pd.DataFrame(all_positions)
+    if not pos_df.empty:
+        pos_df['notional'] = (pos_df['size'] * pos_df['current_price']).abs()
+    total_exposure = float(pos_df['notional'].sum()) if not pos_df.empty else 0
 
     # Display overall summary section
     st.markdown("### 📈 Overall Summary")
@@ -273,136 +464,68 @@ def display_funding_rates(days: int):
             help="Number of active positions across all exchanges"
         )
 
-    # Display per-token metrics including historical positions
-    token_metrics = []
-    processed_symbols = set()  # Track symbols we've processed
-    
-    # First process current positions
-    for pos in all_positions:
-        symbol = pos['symbol']
-        exchange = pos['exchange'].lower()
-        processed_symbols.add(symbol)  # Mark this symbol as processed
-        
-        normalized_symbol = data_processor.normalize_symbol(symbol)
-        notional_size = abs(pos['size'] * pos['current_price'])
-        raw_funding_pnl = historical_funding_payments.get(symbol, 0)  # Get historical funding PnL
-        
-        # Get funding interval from our collected data
-        funding_interval = funding_intervals.get(exchange, 8)  # Default to 8h if not found
+    # Calculate per-token metrics in one vectorized pass
+    token_metrics = pd.DataFrame()
+    if not pos_df.empty:
+        exchange_lc = pos_df['exchange'].str.lower()
+        funding_interval = exchange_lc.map(FUNDING_INTERVAL_HOURS).fillna(8)  # Default to 8h if not found
+        raw_funding_pnl = pos_df['symbol'].map(historical_funding_payments).fillna(0)
         
         # Normalize funding PnL to 8h intervals for fair comparison
-        normalized_funding_pnl = raw_funding_pnl
-        if funding_interval != 8:
-            # If interval is shorter, we need to adjust the PnL to what it would be at 8h intervals
-            normalization_factor = 8 / funding_interval
-            normalized_funding_pnl = raw_funding_pnl / normalization_factor
+        normalized_funding_pnl = raw_funding_pnl * (funding_interval / 8)
         
         # Calculate APY based on normalized 8h funding
-        if normalized_funding_pnl != 0 and notional_size != 0:
-            # Calculate periods per year (using 8h as standard interval)
-            periods_per_year = (365 * 24) / 8  # Number of 8h periods in a year
-            # Calculate APY using the normalized funding PnL
-            funding_apy = (normalized_funding_pnl / notional_size * (periods_per_year / (days * 24 / 8))) * 100
-        else:
-            funding_apy = 0
+        periods_per_year = (365 * 24) / 8  # Number of 8h periods in a year
+        funding_apy = np.where(
+            (normalized_funding_pnl != 0) & (pos_df['notional'] != 0),
+            normalized_funding_pnl / pos_df['notional'] * (periods_per_year / (days * 24 / 8)) * 100,
+            0.0
+        )
         
-        token_metrics.append({
-            'symbol': normalized_symbol,
-            'exchange': exchange,
-            'notional_size': notional_size,
+        token_metrics = pd.DataFrame({
+            'symbol': pos_df['symbol'].map(data_processor.normalize_symbol),
+            'exchange': exchange_lc,
+            'notional_size': pos_df['notional'],
             'raw_funding_pnl': raw_funding_pnl,
             'normalized_funding_pnl': normalized_funding_pnl,
-            'funding_interval': f"{funding_interval}h",
+            'funding_interval': funding_interval.astype(int).astype(str) + 'h',
             'funding_apy': funding_apy,
-            'side': pos['side'].upper(),
+            'side': pos_df['side'].str.upper(),
             'status': 'ACTIVE'
         })
-    
-    # Now process historical positions that aren't currently active
-    for exchange, positions in historical_positions.items():
-        if not isinstance(positions, list):
-            continue
-            
-        for pos in positions:
-            symbol = pos['symbol']
-            if symbol not in processed_symbols:  # Only process if we haven't already
-                normalized_symbol = data_processor.normalize_symbol(symbol)
-                notional_size = abs(pos['size'] * pos['current_price'])
-                raw_funding_pnl = historical_funding_payments.get(symbol, 0)
-                
-                # Get funding interval from our collected data
-                funding_interval = funding_intervals.get(exchange, 8)  # Default to 8h if not found
-                
-                # Normalize funding PnL
-                normalized_funding_pnl = raw_funding_pnl
-                if funding_interval != 8:
-                    normalization_factor = 8 / funding_interval
-                    normalized_funding_pnl = raw_funding_pnl / normalization_factor
-                
-                # Calculate APY (using the last known position size)
-                if normalized_funding_pnl != 0 and notional_size != 0:
-                    periods_per_year = (365 * 24) / 8
-                    funding_apy = (normalized_funding_pnl / notional_size * (periods_per_year / (days * 24 / 8))) * 100
-                else:
-                    funding_apy = 0
-                
-                token_metrics.append({
-                    'symbol': normalized_symbol,
-                    'exchange': exchange,
-                    'notional_size': notional_size,
-                    'raw_funding_pnl': raw_funding_pnl,
-                    'normalized_funding_pnl': normalized_funding_pnl,
-                    'funding_interval': f"{funding_interval}h",
-                    'funding_apy': funding_apy,
-                    'side': pos['side'].upper(),
-                    'status': 'CLOSED'
-                })
-                processed_symbols.add(symbol)  # Mark as processed
 
     # Display funding rate charts
     if all_funding_rates:
-        for exchange in ['bybit', 'binance', 'okx', 'hyperliquid', 'rabbitx']:
-            exchange_rates = [df for df in all_funding_rates if any(df['symbol'].str.contains(exchange))]
-            if exchange_rates:
-                try:
-                    combined_df = pd.concat(exchange_rates, ignore_index=True)
-                    time_col = 'fundingRateTimestamp' if 'fundingRateTimestamp' in combined_df.columns else 'fundingTime'
-                    
-                    # Ensure timestamp is in correct format
-                    if pd.api.types.is_numeric_dtype(combined_df[time_col]):
-                        combined_df[time_col] = pd.to_datetime(combined_df[time_col], unit='ms')
-                    
-                    fig = px.scatter(
-                        combined_df,
-                        x=time_col,
-                        y='fundingRate',
-                        color='symbol',
-                        title=f'Funding Rates History - {exchange.capitalize()}',
-                        labels={
-                            time_col: 'Time',
-                            'fundingRate': 'Funding Rate (%)',
-                            'symbol': 'Token'
-                        }
-                    )
-                    
-                    fig.update_layout(
-                        xaxis_title='Time',
-                        yaxis_title='Funding Rate (%)',
-                        legend_title='Token',
-                        hovermode='x unified',
-                        height=400,
-                        showlegend=True
-                    )
-                    
-                    fig.update_traces(mode='lines+markers')
-                    st.plotly_chart(fig, use_container_width=True)
-                except Exception as e:
-                    print(f"Error creating chart for {exchange}: {str(e)}")
-                    st.error(f"Error creating funding rate chart for {exchange}: {str(e)}")
-
-    # Clear memory
-    del historical_positions
-    del historical_funding_payments
-    del funding_intervals
-    del all_funding_rates
-    gc.collect() 
\ No newline at end of file
+        # Each frame is tagged with its exchange, so split them with one groupby
+        all_rates_df = pd.concat(all_funding_rates, ignore_index=True, copy=False)
+        # Convert any epoch-millisecond timestamps once for all exchanges
+        all_rates_df['fundingTime'] = pd.to_datetime(all_rates_df['fundingTime'], unit='ms', errors='coerce')
+        for exchange, combined_df in all_rates_df.groupby('exchange', sort=False):
+            try:
+                # WebGL traces stay responsive with thousands of points
+                fig = go.Figure()
+                for symbol, symbol_df in combined_df.groupby('symbol', sort=False):
+                    # A funding chart gains nothing visually from more than ~500 points per token
+                    if len(symbol_df) > MAX_CHART_POINTS:
+                        symbol_df = symbol_df.iloc[::len(symbol_df) // MAX_CHART_POINTS]
+                    fig.add_trace(go.Scattergl(
+                        x=symbol_df['fundingTime'],
+                        y=symbol_df['fundingRate'],
+                        mode='lines+markers',
+                        name=symbol
+                    ))
+                
+                fig.update_layout(
+                    xaxis_title='Time',
+                    yaxis_title='Funding Rate (%)',
+                    legend_title='Token',
+                    hovermode='x unified',
+                    height=400,
+                    showlegend=True,
+                    title=f'Funding Rates History - {exchange.capitalize()}'
+                )
+                
+                st.plotly_chart(fig, use_container_width=True)
+            except Exception as e:
+                logger.warning(f"Error creating chart for {exchange}: {str(e)}")
+                st.error(f"Error creating funding rate chart for {exchange}: {str(e)}") 
\ No newline at end of file
@@ -9,8 +9,8 @@ def render_historical_pnl(historical_data: pd.DataFrame):
     
     fig = go.Figure()
     
-    for exchange in historical_data['exchange'].unique():
-        exchange_data = historical_data[historical_data['exchange'] == exchange]
+    # Partition by exchange in one pass; observed=True skips unused categories
+    for exchange, exchange_data in historical_data.groupby('exchange', sort=False, observed=True):
         fig.add_trace(go.Bar(
             x=exchange_data['date'],
             y=exchange_data['realized_pnl'],
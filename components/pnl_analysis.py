@@ -2,65 +2,93 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from typing import Dict, List, Any, Optional, Tuple
-from utils.exchange_client import ExchangeClient
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+from utils.exchange_client import ExchangeClient, get_exchange_client
 from utils.data_processor import DataProcessor
-import gc
+from components.funding_rates_updated import credentials_digest, script_executor
 import logging
 import time
+from collections import Counter
+from concurrent.futures import as_completed
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+# Hash the shared client by identity so a client argument never has its internals hashed
+CLIENT_HASH_FUNCS = {ExchangeClient: id}
+
+# Mock net transfers for centralized exchanges until transfer history is integrated
+_MOCK_TRANSFERS = {
+    'binance': 5000.0,  # Net $5000 transferred in
+    'bybit': 3000.0,    # Net $3000 transferred in
+    'okx': 2000.0       # Net $2000 transferred in
+}
+
+# Mock net deposits for decentralized exchanges until deposit history is integrated
+_MOCK_DEPOSITS = {
+    'hyperliquid': 4000.0,  # Net $4000 deposited
+    'rabbitx': 2500.0       # Net $2500 deposited
+}
+
 def get_client() -> ExchangeClient:
-    """Get exchange client from session state or create a new one.
+    """Get the shared cached exchange client.
     
     Returns:
         ExchangeClient: The exchange client instance.
     """
-    return st.session_state.client if 'client' in st.session_state else ExchangeClient()
+    return get_exchange_client()
 
-def get_account_balances() -> Dict[str, float]:
-    """Get current account balances for all exchanges.
+# Display names of the exchanges whose balances are fetched, in fetch order
+BALANCE_EXCHANGES = {
+    'binance': 'Binance',
+    'bybit': 'Bybit',
+    'okx': 'OKX',
+    'hyperliquid': 'Hyperliquid',
+    'rabbitx': 'RabbitX'
+}
+
+# How each exchange's balance is read from the client
+_BALANCE_GETTERS = {
+    'binance': lambda client: client.get_binance_balance(),
+    'bybit': lambda client: client.get_usdt_balance('bybit'),
+    'okx': lambda client: client.get_okx_balance(),
+    'hyperliquid': lambda client: client.get_hyperliquid_balance(),
+    'rabbitx': lambda client: client.get_rabbitx_balance()
+}
+
+@st.cache_data(ttl=30, max_entries=16, show_spinner=False)  # Cache for 30 seconds, balances only move with trades
+def _fetch_balance_cached(exchange: str) -> float:
+    """Fetch the current account balance for one exchange.
+    
+    Errors are raised rather than returned so that failed fetches are not cached.
     
+    Args:
+        exchange: Name of the exchange.
+        
     Returns:
-        Dict[str, float]: Dictionary mapping exchange names to their current balances.
+        float: The exchange's current balance.
     """
-    client = get_client()
-    balances = {}
+    return _BALANCE_GETTERS[exchange](get_client()) or 0.0
+
+def iter_account_balances() -> Iterator[Tuple[str, float]]:
+    """Fetch all exchanges' balances concurrently, yielding each as soon as it arrives.
     
-    # Get balances for each exchange
-    try:
-        balances['binance'] = client.get_binance_balance() or 0.0
-    except Exception as e:
-        st.error(f"Error fetching Binance balance: {str(e)}")
-        balances['binance'] = 0.0
-        
-    try:
-        balances['bybit'] = client.get_usdt_balance('bybit') or 0.0
-    except Exception as e:
-        st.error(f"Error fetching Bybit balance: {str(e)}")
-        balances['bybit'] = 0.0
-        
-    try:
-        balances['okx'] = client.get_okx_balance() or 0.0
-    except Exception as e:
-        st.error(f"Error fetching OKX balance: {str(e)}")
-        balances['okx'] = 0.0
-        
-    try:
-        balances['hyperliquid'] = client.get_hyperliquid_balance() or 0.0
-    except Exception as e:
-        st.error(f"Error fetching Hyperliquid balance: {str(e)}")
-        balances['hyperliquid'] = 0.0
-        
-    try:
-        balances['rabbitx'] = client.get_rabbitx_balance() or 0.0
-    except Exception as e:
-        st.error(f"Error fetching RabbitX balance: {str(e)}")
-        balances['rabbitx'] = 0.0
+    Failed fetches are reported with st.error and yield a balance of 0.0.
     
-    return balances
+    Yields:
+        Tuple[str, float]: Exchange name and its current balance, in completion order.
+    """
+    with script_executor(max_workers=len(BALANCE_EXCHANGES)) as executor:
+        futures = {executor.submit(_fetch_balance_cached, exchange): exchange for exchange in BALANCE_EXCHANGES}
+        for future in as_completed(futures):
+            exchange = futures[future]
+            try:
+                yield exchange, future.result()
+            except Exception as e:
+                st.error(f"Error fetching {BALANCE_EXCHANGES[exchange]} balance: {str(e)}")
+                yield exchange, 0.0
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
+@st.cache_data(ttl=3600, max_entries=16, hash_funcs=CLIENT_HASH_FUNCS, show_spinner=False)  # Cache for 1 hour, limit entries
 def get_net_transfers(exchange: str) -> float:
     """Get net transfers (transfers in - transfers out) for centralized exchanges.
     
@@ -74,49 +102,20 @@ def get_net_transfers(exchange: str) -> float:
     # For this prototype, we'll use mock data that would be replaced with actual API calls.
     client = get_client()
 
-    # Mock data for demonstration
-    if exchange == 'binance':
-        """
-        Example response:
-        [
-        {
-            "counterParty":"master",
-            "email":"master@test.com",
-            "type":1,  // 1 for transfer in, 2 for transfer out
-            "asset":"BTC",
-            "qty":"1",
-            "fromAccountType":"SPOT",
-            "toAccountType":"SPOT",
-            "status":"SUCCESS", // status: PROCESS / SUCCESS / FAILURE
-            "tranId":11798835829,
-            "time":1544433325000
-        },
-        {
-            "counterParty":"subAccount",
-            "email":"sub2@test.com",
-            "type":1,                                 
-            "asset":"ETH",
-            "qty":"2",
-            "fromAccountType":"SPOT",
-            "toAccountType":"COIN_FUTURE",
-            "status":"SUCCESS",
-            "tranId":11798829519,
-            "time":1544433326000
-        }
-        ]"""
     # For Binance, we need to get the subaccount transfer history
     # This would be replaced with actual API calls in production
     if exchange == 'binance':
         try:
             transfers = client.binance_client.get_subaccount_transfer_history()
             # Calculate net transfers from SPOT to UM_FUTURE
-            net_transfers = sum([
-                float(transfer['qty']) if transfer['fromAccountType'] == 'SPOT' and transfer['toAccountType'] == 'UM_FUTURE' else
-                -float(transfer['qty']) if transfer['fromAccountType'] == 'UM_FUTURE' and transfer['toAccountType'] == 'SPOT' else 0
-                for transfer in transfers
-            ])
-            # Print the net transfers in green
-            print(f"\033[92mNet transfers for Binance: ${transfers}\033[0m")
+            df = pd.DataFrame(transfers)
+            net_transfers = 0.0
+            if not df.empty:
+                qty = df['qty'].astype(float)
+                transfers_in = (df['fromAccountType'] == 'SPOT') & (df['toAccountType'] == 'UM_FUTURE')
+                transfers_out = (df['fromAccountType'] == 'UM_FUTURE') & (df['toAccountType'] == 'SPOT')
+                net_transfers = float(qty[transfers_in].sum() - qty[transfers_out].sum())
+            logger.debug("Net transfers for Binance: %s", net_transfers)
             return net_transfers
         except Exception as e:
             logging.error(f"Error fetching Binance subaccount transfers: {str(e)}")
@@ -125,27 +124,21 @@ def get_net_transfers(exchange: str) -> float:
     if exchange == 'bybit':
         try:
             transfers = client.bybit_client.get_transfer_list()
-            # Calculate net transfers from SPOT to UM_FUTURE
-            net_transfers = sum([
-                float(transfer['qty']) if transfer['type'] == 'TRANSFER_IN' else
-                -float(transfer['qty']) if transfer['type'] == 'TRANSFER_OUT' else 0
-            ])
-            # Print the net transfers in green
-            print(f"\033[91mNet transfers for Bybit: ${transfers}\033[0m")
+            # Calculate net transfers in minus transfers out
+            df = pd.DataFrame(transfers)
+            net_transfers = 0.0
+            if not df.empty:
+                qty = df['qty'].astype(float)
+                net_transfers = float(qty[df['type'] == 'TRANSFER_IN'].sum() - qty[df['type'] == 'TRANSFER_OUT'].sum())
+            logger.debug("Net transfers for Bybit: %s", net_transfers)
             return net_transfers
         except Exception as e:
             logging.error(f"Error fetching Bybit subaccount transfers: {str(e)}")
             return 0.0
-    # Get net subaccount transfer data for Binance
-    mock_data = {
-        'binance': 5000.0,  # Net $5000 transferred in
-        'bybit': 3000.0,    # Net $3000 transferred in
-        'okx': 2000.0       # Net $2000 transferred in
-    }
-    
-    return mock_data.get(exchange, 0.0)
+    # Mock data for demonstration
+    return _MOCK_TRANSFERS.get(exchange, 0.0)
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
+@st.cache_data(ttl=3600, max_entries=16, hash_funcs=CLIENT_HASH_FUNCS, show_spinner=False)  # Cache for 1 hour, limit entries
 def get_net_deposits(exchange: str) -> float:
     """Get net deposits (deposits - withdrawals) for decentralized exchanges.
     
@@ -159,48 +152,66 @@ def get_net_deposits(exchange: str) -> float:
     # For this prototype, we'll use mock data that would be replaced with actual API calls.
     
     # Mock data for demonstration
-    mock_data = {
-        'hyperliquid': 4000.0,  # Net $4000 deposited
-        'rabbitx': 2500.0       # Net $2500 deposited
-    }
-    
-    return mock_data.get(exchange, 0.0)
+    return _MOCK_DEPOSITS.get(exchange, 0.0)
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def get_funding_payments_by_symbol(exchange: str, days: int = 30) -> Dict[str, float]:
+@st.cache_data(ttl=300, max_entries=32, hash_funcs=CLIENT_HASH_FUNCS, show_spinner=False)  # Cache for 5 minutes, limit entries
+def get_funding_payments_by_symbol(exchange: str, days: int = 30, creds_hash: Optional[str] = None,
+                                   _creds: Optional[Dict[str, str]] = None) -> Dict[str, float]:
     """Get funding payments grouped by symbol for a specific exchange.
     
     Args:
         exchange: Name of the exchange.
         days: Number of days to look back for funding payments.
+        creds_hash: Digest of the exchange's credentials, part of the cache key.
+        _creds: The exchange's credentials, not hashed.
         
     Returns:
         Dict[str, float]: Dictionary mapping symbols to their funding payment amounts.
+        
+    Raises:
+        Exception: If the payments cannot be calculated. Errors are raised rather
+            than reported here so that they are not cached and are shown from the
+            script thread.
     """
     client = get_client()
+    creds = _creds or {}
     
     # Set appropriate credentials based on exchange
     if exchange == 'hyperliquid':
-        hyperliquid_wallet = st.session_state.exchange_credentials.get('hyperliquid', {}).get('api_key', "")
-        hyperliquid_key = st.session_state.exchange_credentials.get('hyperliquid', {}).get('secret', "")
-        
-        if hyperliquid_wallet and hyperliquid_key:
-            client._hyperliquid_api_key = hyperliquid_wallet
-            client._hyperliquid_secret = hyperliquid_key
+        if creds.get('api_key') and creds.get('secret'):
+            client._hyperliquid_api_key = creds['api_key']
+            client._hyperliquid_secret = creds['secret']
     
     elif exchange == 'rabbitx':
-        rabbitx_creds = st.session_state.exchange_credentials.get('rabbitx', {})
-        if rabbitx_creds:
-            client._rabbitx_api_key = rabbitx_creds.get('api_key', "")
-            client._rabbitx_secret = rabbitx_creds.get('secret', "")
-            client._rabbitx_jwt_token = rabbitx_creds.get('jwt_token', "")
+        if creds:
+            client._rabbitx_api_key = creds.get('api_key', "")
+            client._rabbitx_secret = creds.get('secret', "")
+            client._rabbitx_jwt_token = creds.get('jwt_token', "")
     
-    # Get funding payments
-    try:
-        return client.calculate_funding_payments(exchange, days)
-    except Exception as e:
-        st.error(f"Error calculating funding payments for {exchange}: {str(e)}")
-        return {}
+    # Bypass the client's own five-minute cache, which is not keyed on credentials
+    return client.fetch_funding_payments(exchange, days)
+
+# How each exchange's PnL baseline is fetched
+BASELINES = {
+    'binance': get_net_transfers,
+    'bybit': get_net_transfers,
+    'okx': get_net_transfers,
+    'hyperliquid': get_net_deposits,
+    'rabbitx': get_net_deposits
+}
+
+@st.cache_data(ttl=3600)  # Cache for 1 hour, matching the transfer and deposit caches
+def _all_baselines() -> Dict[str, float]:
+    """Get every exchange's PnL baseline in one cached fetch.
+    
+    The baseline is net transfers for centralized exchanges and net deposits
+    for decentralized exchanges.
+    
+    Returns:
+        Dict[str, float]: Dictionary mapping exchange names to their baselines.
+    """
+    with script_executor(max_workers=len(BASELINES)) as executor:
+        return dict(executor.map(lambda item: (item[0], item[1](item[0])), BASELINES.items()))
 
 def calculate_pnl(current_balances: Dict[str, float]) -> Tuple[Dict[str, float], float]:
     """Calculate PnL for each exchange and total PnL.
@@ -211,32 +222,39 @@ def calculate_pnl(current_balances: Dict[str, float]) -> Tuple[Dict[str, float],
     Returns:
         Tuple[Dict[str, float], float]: Dictionary of PnL per exchange and total PnL.
     """
-    pnl_by_exchange = {}
-    total_pnl = 0.0
+    return _calc_pnl(tuple(sorted(current_balances.items())))
+
+@st.cache_data(ttl=30, max_entries=32)  # Cache for 30 seconds, matching the balances cache
+def _calc_pnl(balance_items: Tuple[Tuple[str, float], ...]) -> Tuple[Dict[str, float], float]:
+    """Calculate PnL from balances given as sorted (exchange, balance) pairs.
     
-    # Calculate PnL for centralized exchanges (current equity - net transfers)
-    for exchange in ['binance', 'bybit', 'okx']:
-        current_balance = current_balances.get(exchange, 0.0)
-        net_transfers = get_net_transfers(exchange)
-        pnl = current_balance - net_transfers
-        pnl_by_exchange[exchange] = pnl
-        total_pnl += pnl
+    Args:
+        balance_items: Current account balances as a hashable tuple of pairs.
+        
+    Returns:
+        Tuple[Dict[str, float], float]: Dictionary of PnL per exchange and total PnL.
+    """
+    current_balances = dict(balance_items)
+    baselines = _all_baselines()
     
-    # Calculate PnL for decentralized exchanges (current equity - net deposits)
-    for exchange in ['hyperliquid', 'rabbitx']:
-        current_balance = current_balances.get(exchange, 0.0)
-        net_deposits = get_net_deposits(exchange)
-        pnl = current_balance - net_deposits
-        pnl_by_exchange[exchange] = pnl
-        total_pnl += pnl
+    # PnL is current equity minus net transfers (centralized) or net deposits (decentralized)
+    pnl_by_exchange = {
+        exchange: current_balances.get(exchange, 0.0) - baselines.get(exchange, 0.0)
+        for exchange in BASELINES
+    }
     
-    return pnl_by_exchange, total_pnl
+    return pnl_by_exchange, sum(pnl_by_exchange.values())
 
-def aggregate_funding_payments(days: int = 30) -> Tuple[Dict[str, Dict[str, float]], Dict[str, float], float]:
+def aggregate_funding_payments(days: int = 30, credentials: Optional[Dict[str, Dict[str, str]]] = None
+                               ) -> Tuple[Dict[str, Dict[str, float]], Dict[str, float], float]:
     """Aggregate funding payments across all exchanges by symbol.
     
+    Not cached itself: each exchange's payments are cached by
+    get_funding_payments_by_symbol, and failures must stay uncached.
+    
     Args:
         days: Number of days to look back for funding payments.
+        credentials: Credentials by exchange name.
         
     Returns:
         Tuple containing:
@@ -244,24 +262,35 @@ def aggregate_funding_payments(days: int = 30) -> Tuple[Dict[str, Dict[str, floa
             - Dict[str, float]: Total funding payments per symbol
             - float: Total funding payments across all symbols and exchanges
     """
-    # Get funding payments by exchange and symbol
+    exchanges = ['binance', 'bybit', 'okx', 'hyperliquid', 'rabbitx']
+    exchange_creds = {exchange: dict((credentials or {}).get(exchange, {})) for exchange in exchanges}
+    
+    # Fetch every exchange's funding payments concurrently; cache hits return immediately
+    with script_executor(max_workers=len(exchanges)) as executor:
+        futures = {
+            exchange: executor.submit(
+                get_funding_payments_by_symbol,
+                exchange, days, credentials_digest(exchange_creds[exchange]), exchange_creds[exchange]
+            )
+            for exchange in exchanges
+        }
+    
+    # Report failures from the script thread, in a fixed exchange order
     funding_by_exchange = {}
-    total_by_symbol = {}
-    total_funding = 0.0
+    for exchange, future in futures.items():
+        try:
+            funding_by_exchange[exchange] = future.result()
+        except Exception as e:
+            st.error(f"Error calculating funding payments for {exchange}: {str(e)}")
+            funding_by_exchange[exchange] = {}
     
-    # Get funding payments for each exchange
-    for exchange in ['binance', 'bybit', 'okx', 'hyperliquid', 'rabbitx']:
-        funding_payments = get_funding_payments_by_symbol(exchange, days)
-        funding_by_exchange[exchange] = funding_payments
-        
-        # Aggregate by symbol across exchanges
-        for symbol, amount in funding_payments.items():
-            if symbol not in total_by_symbol:
-                total_by_symbol[symbol] = 0.0
-            total_by_symbol[symbol] += amount
-            total_funding += amount
+    # Aggregate by symbol across exchanges
+    total_by_symbol = Counter()
+    for funding_payments in funding_by_exchange.values():
+        total_by_symbol.update(funding_payments)
+    total_funding = float(sum(total_by_symbol.values()))
     
-    return funding_by_exchange, total_by_symbol, total_funding
+    return funding_by_exchange, dict(total_by_symbol), total_funding
 
 def display_pnl_analysis(days: int):
     """Display PnL analysis tab content.
@@ -271,14 +300,26 @@ def display_pnl_analysis(days: int):
     """
     st.subheader("💰 PnL Analysis")
     
-    # Get current account balances
-    current_balances = get_account_balances()
+    # Balances are cached briefly; let the user force a fresh fetch
+    if st.button("🔄 Refresh Balances"):
+        _fetch_balance_cached.clear()
+    
+    # Paint each exchange's balance as soon as it arrives rather than after the slowest
+    st.markdown("### 🏦 Account Balances")
+    columns = st.columns(len(BALANCE_EXCHANGES))
+    placeholders = {exchange: column.empty() for exchange, column in zip(BALANCE_EXCHANGES, columns)}
+    current_balances = {}
+    for exchange, balance in iter_account_balances():
+        current_balances[exchange] = balance
+        placeholders[exchange].metric(BALANCE_EXCHANGES[exchange], f"${balance:,.2f}")
     
     # Calculate PnL
     pnl_by_exchange, total_pnl = calculate_pnl(current_balances)
     
     # Get funding payments data
-    funding_by_exchange, total_funding_by_symbol, total_funding = aggregate_funding_payments(days)
+    # Credentials are passed in explicitly so that changing them misses the caches
+    credentials = dict(st.session_state.exchange_credentials)
+    funding_by_exchange, total_funding_by_symbol, total_funding = aggregate_funding_payments(days, credentials)
     
     # Display overall PnL analysis
     st.markdown("### 📊 Overall PnL Analysis")
@@ -303,6 +344,3 @@ def display_pnl_analysis(days: int):
             f"${(total_pnl - total_funding):,.2f}",
             help="PnL attributable to trading (excluding funding)"
         )
-    
-    # Clean up memory
-    gc.collect() 
\ No newline at end of file
@@ -1,38 +1,43 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 
 def render_positions_table(positions_df: pd.DataFrame):
     if positions_df.empty:
         st.info("No active positions found")
         return
 
-    # Group positions by symbol (already normalized)
-    grouped_positions = positions_df.groupby('symbol').agg({
-        'exchange': lambda x: ', '.join(sorted(set(x))),
-        'raw_symbol': lambda x: ', '.join(sorted(set(x))),
+    # Group positions by symbol (already normalized); numeric columns use the
+    # built-in aggregations, the text columns list each distinct value once
+    by_symbol = positions_df.groupby('symbol', sort=False)
+    grouped_positions = by_symbol.agg({
         'size': 'sum',
         'entry_price': 'mean',
         'current_price': 'mean',
         'pnl': 'sum'
-    }).reset_index()
+    }).join(
+        by_symbol[['exchange', 'raw_symbol']].agg(lambda x: ', '.join(pd.unique(x)))
+    ).reset_index()
 
-    # Format the display
-    display_df = grouped_positions.copy()
-    display_df['Token'] = display_df['symbol']
-    display_df['Exchanges'] = display_df['exchange']
-    display_df['Size'] = display_df['size'].round(4)
-    display_df['Entry Price'] = display_df['entry_price'].apply(lambda x: f"${x:,.2f}")
-    display_df['Current Price'] = display_df['current_price'].apply(lambda x: f"${x:,.2f}")
-    display_df['PnL'] = display_df['pnl'].apply(lambda x: f"${x:,.2f}")
+    # Keep the columns numeric and format them only for display
+    display_df = pd.DataFrame({
+        'Token': grouped_positions['symbol'],
+        'Exchanges': grouped_positions['exchange'],
+        'Size': grouped_positions['size'],
+        'Entry Price': grouped_positions['entry_price'],
+        'Current Price': grouped_positions['current_price'],
+        'PnL': grouped_positions['pnl']
+    })
+
+    # Color every row by the sign of its PnL, computed once for the whole column
+    colors = np.where(display_df['PnL'].to_numpy() >= 0, 'color: #2ECC71', 'color: #E74C3C')
 
     st.dataframe(
-        display_df[[
-            'Token', 'Exchanges', 'Size', 'Entry Price',
-            'Current Price', 'PnL'
-        ]].style.apply(
-            lambda x: ['color: #2ECC71' if float(x['PnL'].replace('$', '').replace(',', '')) >= 0 else 'color: #E74C3C' 
-                      for _ in range(len(x))],
-            axis=1
-        ),
+        display_df.style.format({
+            'Size': '{:,.4f}',
+            'Entry Price': '${:,.2f}',
+            'Current Price': '${:,.2f}',
+            'PnL': '${:,.2f}'
+        }).apply(lambda _: colors, axis=0),
         height=400
-    )
\ No newline at end of file
+    )
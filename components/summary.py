@@ -2,6 +2,7 @@ import streamlit as st
 import plotly.graph_objects as go
 from typing import Dict
 import pandas as pd
+import numpy as np
 
 def render_summary_metrics(metrics: Dict):
     # Total metrics
@@ -53,22 +54,38 @@ def render_pnl_chart(pnl_data: pd.DataFrame):
         st.info("No USDT PnL data available")
         return
 
-    fig = go.Figure()
+    # Order rows by exchange (in order of first appearance), then by date
+    by_date = pnl_data.sort_values('date', kind='stable')
+    codes, exchanges = pd.factorize(by_date['exchange'])
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    dates = by_date['date'].to_numpy()[order]
+    values = by_date['realized_pnl'].to_numpy(dtype=float)[order]
 
-    # Plot individual exchange lines
-    for exchange in pnl_data['exchange'].unique():
-        exchange_data = pnl_data[pnl_data['exchange'] == exchange]
-        fig.add_trace(go.Scatter(
-            x=exchange_data['date'],
-            y=exchange_data['realized_pnl'].cumsum(),  # Show cumulative PnL
+    # Cumulative PnL summed separately within each exchange's block; like
+    # pandas' cumsum, a missing value stays missing without breaking the total
+    starts = np.r_[0, np.flatnonzero(np.diff(codes)) + 1]
+    ends = np.r_[starts[1:], len(values)]
+    cum_pnl = np.empty_like(values)
+    for start, end in zip(starts, ends):
+        cum_pnl[start:end] = np.nancumsum(values[start:end])
+    cum_pnl[np.isnan(values)] = np.nan
+
+    # Individual exchange lines
+    traces = [
+        go.Scatter(
+            x=dates[start:end],
+            y=cum_pnl[start:end],  # Show cumulative PnL
             mode='lines+markers',
             name=f"{exchange.capitalize()} USDT PnL",
             line=dict(width=2)
-        ))
+        )
+        for exchange, start, end in zip(exchanges[codes[starts]], starts, ends)
+    ]
 
-    # Add total PnL line
+    # Total PnL line
     total_by_date = pnl_data.groupby('date')['realized_pnl'].sum().cumsum()
-    fig.add_trace(go.Scatter(
+    traces.append(go.Scatter(
         x=total_by_date.index,
         y=total_by_date.values,
         mode='lines',
@@ -77,29 +94,33 @@ def render_pnl_chart(pnl_data: pd.DataFrame):
         opacity=0.8
     ))
 
-    fig.update_layout(
-        title='Cumulative USDT PnL',
-        plot_bgcolor='#1E1E1E',
-        paper_bgcolor='#1E1E1E',
-        font=dict(color='#FFFFFF'),
-        xaxis=dict(
-            showgrid=False,
-            title='Date'
-        ),
-        yaxis=dict(
-            showgrid=True,
-            gridcolor='#252525',
-            title='Cumulative USDT PnL'
-        ),
-        margin=dict(l=0, r=0, t=30, b=0),
-        height=300,
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
+    # Build the figure once from all traces instead of appending them one by one
+    fig = go.Figure(
+        data=traces,
+        layout=dict(
+            title='Cumulative USDT PnL',
+            plot_bgcolor='#1E1E1E',
+            paper_bgcolor='#1E1E1E',
+            font=dict(color='#FFFFFF'),
+            xaxis=dict(
+                showgrid=False,
+                title='Date'
+            ),
+            yaxis=dict(
+                showgrid=True,
+                gridcolor='#252525',
+                title='Cumulative USDT PnL'
+            ),
+            margin=dict(l=0, r=0, t=30, b=0),
+            height=300,
+            showlegend=True,
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="right",
+                x=1
+            )
         )
     )
 
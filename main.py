@@ -1,13 +1,14 @@
 import streamlit as st
-import time
-from src.exchange_client import ExchangeClient
+from utils.exchange_client import ExchangeClient
 from utils.data_processor import DataProcessor
 from components.positions import render_positions_table
 from components.funding_rates_updated import (
     display_funding_rates,
     get_cached_positions,
     get_cached_funding_history,
-    get_cached_funding_payments
+    get_cached_funding_payments,
+    script_executor,
+    _exchange_credentials
 )
 import json
 from binance.spot import Spot as Client
@@ -15,8 +16,15 @@ from pybit.unified_trading import HTTP
 import okx.Account as Account
 import gc
 import ccxt
+from concurrent.futures import as_completed
 import psutil
 import os
+import logging
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
 
 # Page configuration
 st.set_page_config(
@@ -25,68 +33,90 @@ st.set_page_config(
     layout="wide"
 )
 
-# Memory management function
-def check_memory_usage():
+# Memory management
+MEMORY_LIMIT_MB = 500
+
+# Exchanges shown in the sidebar and positions table, in display order
+EXCHANGES = ('binance', 'bybit', 'okx', 'hyperliquid', 'rabbitx')
+
+# Credential fields entered in the sidebar for each exchange
+REQUIRED_FIELDS = MappingProxyType({
+    'binance': ('api_key', 'secret'),
+    'bybit': ('api_key', 'secret'),
+    'okx': ('api_key', 'secret', 'password'),
+    'hyperliquid': ('api_key', 'secret'),
+    'rabbitx': ('api_key', 'secret', 'jwt_token')
+})
+
+@st.cache_resource
+def _memory_monitor():
+    """Register a garbage collector callback, once per process, that records memory pressure"""
+    state = {'pressure': False, 'rss_mb': 0.0}
     process = psutil.Process(os.getpid())
-    memory_usage = process.memory_info().rss / 1024 / 1024  # Convert to MB
-    if memory_usage > 500:  # If memory usage exceeds 500MB
-        st.warning(f"High memory usage detected ({memory_usage:.2f}MB). Clearing cache...")
+
+    def _on_gc(phase, info):
+        # Only sample after full collections, when the resident size is most meaningful
+        if phase == "stop" and info["generation"] == 2:
+            state['rss_mb'] = process.memory_info().rss / 1024 / 1024
+            state['pressure'] = state['rss_mb'] > MEMORY_LIMIT_MB
+
+    gc.callbacks.append(_on_gc)
+    return state
+
+def check_memory_usage():
+    state = _memory_monitor()
+    if state['pressure']:
+        st.warning(f"High memory usage detected ({state['rss_mb']:.2f}MB). Clearing cache...")
         st.cache_data.clear()
-        gc.collect()
+        state['pressure'] = False
         return True
     return False
 
-# Load custom CSS
-with open('styles/custom.css') as f:
-    st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+# Load custom CSS once per process
+@st.cache_resource
+def _css_blob():
+    with open(os.path.join('styles', 'custom.css')) as f:
+        return f.read()
 
-# Clear session state for credentials
-if 'exchange_credentials' in st.session_state:
-    del st.session_state.exchange_credentials
+st.markdown(f'<style>{_css_blob()}</style>', unsafe_allow_html=True)
+
+# Cache secret lookups so sidebar defaults don't hit st.secrets on every rerun
+@st.cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
+def _load_secret(key):
+    """Get a value from Streamlit secrets, or an empty string if it is not set"""
+    return st.secrets.get(key, "")
 
 # Initialize session state for credentials if not exists
 if 'exchange_credentials' not in st.session_state:
     # Load credentials from secrets
-    hyperliquid_wallet = st.secrets.get("HYPERLIQUID_API_KEY")
-    hyperliquid_key = st.secrets.get("HYPERLIQUID_SECRET_KEY")
+    hyperliquid_wallet = _load_secret("HYPERLIQUID_API_KEY")
+    hyperliquid_key = _load_secret("HYPERLIQUID_SECRET_KEY")
 
     # Extract credentials for each exchange
-    binance_api_key = st.secrets.get("BINANCE_API_KEY")
-    binance_secret = st.secrets.get("BINANCE_SECRET")
-    
-    bybit_api_key = st.secrets.get("BYBIT_API_KEY")
-    bybit_secret = st.secrets.get("BYBIT_SECRET")
-    
-    okx_api_key = st.secrets.get("OKX_API_KEY")
-    okx_secret = st.secrets.get("OKX_SECRET")
-    okx_password = st.secrets.get("OKX_PASSWORD")
-    
-    rabbitx_api_key = st.secrets.get("RABBITX_API_KEY")
-    rabbitx_secret = st.secrets.get("RABBITX_SECRET_KEY")
-    rabbitx_jwt_token = st.secrets.get("RABBITX_JWT_TOKEN")
-
-    # Print debug info for all credentials
-    print(f"Loading Binance credentials:")
-    print(f"API Key present: {bool(binance_api_key)}")
-    print(f"Secret present: {bool(binance_secret)}")
+    binance_api_key = _load_secret("BINANCE_API_KEY")
+    binance_secret = _load_secret("BINANCE_SECRET")
     
-    print(f"Loading Bybit credentials:")
-    print(f"API Key present: {bool(bybit_api_key)}")
-    print(f"Secret present: {bool(bybit_secret)}")
+    bybit_api_key = _load_secret("BYBIT_API_KEY")
+    bybit_secret = _load_secret("BYBIT_SECRET")
     
-    print(f"Loading OKX credentials:")
-    print(f"API Key present: {bool(okx_api_key)}")
-    print(f"Secret present: {bool(okx_secret)}")
-    print(f"Password present: {bool(okx_password)}")
+    okx_api_key = _load_secret("OKX_API_KEY")
+    okx_secret = _load_secret("OKX_SECRET")
+    okx_password = _load_secret("OKX_PASSWORD")
     
-    print(f"Loading RabbitX credentials:")
-    print(f"API Key present: {bool(rabbitx_api_key)}")
-    print(f"Secret present: {bool(rabbitx_secret)}")
-    print(f"JWT Token present: {bool(rabbitx_jwt_token)}")
-    
-    print(f"Loading Hyperliquid credentials:")
-    print(f"Wallet Address present: {bool(hyperliquid_wallet)}")
-    print(f"Private Key present: {bool(hyperliquid_key)}")
+    rabbitx_api_key = _load_secret("RABBITX_API_KEY")
+    rabbitx_secret = _load_secret("RABBITX_SECRET_KEY")
+    rabbitx_jwt_token = _load_secret("RABBITX_JWT_TOKEN")
+
+    # Log credential status without printing actual values
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Credentials present: binance=%s bybit=%s okx=%s rabbitx=%s hyperliquid=%s",
+            bool(binance_api_key and binance_secret),
+            bool(bybit_api_key and bybit_secret),
+            bool(okx_api_key and okx_secret and okx_password),
+            bool(rabbitx_api_key and rabbitx_secret and rabbitx_jwt_token),
+            bool(hyperliquid_wallet and hyperliquid_key)
+        )
     
     # Check if any credentials are missing
     if not binance_api_key or not binance_secret:
@@ -126,51 +156,42 @@ if 'exchange_credentials' not in st.session_state:
     }
 
 # Initialize clients with proper cleanup
-@st.cache_resource(ttl=1800)  # Cache for 30 minutes
-def get_exchange_client():
-    """Get a cached instance of ExchangeClient"""
-    # Get RabbitX credentials
-    rabbitx_creds = st.session_state.exchange_credentials.get('rabbitx', {})
-    client = ExchangeClient(
-        rabbitx_api_key=rabbitx_creds.get('api_key', ""),
-        rabbitx_api_secret=rabbitx_creds.get('secret', ""),
-        rabbitx_testnet=False,
-        rabbitx_jwt_token=rabbitx_creds.get('jwt_token', "")
-    )
+# Evicted clients are closed by ExchangeClient.__del__ once no session holds them
+@st.cache_resource(ttl=1800, max_entries=4)  # Cache for 30 minutes, at most a few credential sets
+def get_exchange_client(rabbitx_key, rabbitx_secret, rabbitx_jwt, hl_key, hl_secret):
+    """Get a cached instance of ExchangeClient, fully initialized for the given credentials"""
+    client = ExchangeClient()
+    client._rabbitx_api_key = rabbitx_key
+    client._rabbitx_secret = rabbitx_secret
+    client._rabbitx_jwt_token = rabbitx_jwt
     
     # Set Hyperliquid credentials if available
-    hyperliquid_creds = st.session_state.exchange_credentials.get('hyperliquid', {})
-    if hyperliquid_creds:
-        client._hyperliquid_api_key = hyperliquid_creds.get('api_key', "")
-        client._hyperliquid_secret = hyperliquid_creds.get('secret', "")
-        print(f"\nInitializing ExchangeClient with Hyperliquid credentials:")
-        print(f"Wallet Address present: {bool(client._hyperliquid_api_key)}")
-        print(f"Private Key present: {bool(client._hyperliquid_secret)}")
+    if hl_key or hl_secret:
+        client._hyperliquid_api_key = hl_key
+        client._hyperliquid_secret = hl_secret
+        logger.debug("Initializing ExchangeClient with Hyperliquid credentials: wallet=%s key=%s",
+                     bool(hl_key), bool(hl_secret))
     
     return client
 
-@st.cache_resource(ttl=1800)  # Cache for 30 minutes
+@st.cache_resource(ttl=1800, max_entries=1)  # Cache for 30 minutes, takes no arguments
 def get_data_processor():
     """Get a cached instance of DataProcessor"""
     return DataProcessor()
 
-# Clean up old resources before creating new ones
-if 'client' in st.session_state:
-    del st.session_state.client
-if 'processor' in st.session_state:
-    del st.session_state.processor
-
-# Force garbage collection
-gc.collect()
-
-# Initialize clients
-client = get_exchange_client()
+# Initialize clients; st.cache_resource shares one instance of each across sessions
+# and only builds a new client when the credential strings change
+rabbitx_creds = st.session_state.exchange_credentials.get('rabbitx', {})
+hyperliquid_creds = st.session_state.exchange_credentials.get('hyperliquid', {})
+client = get_exchange_client(
+    rabbitx_creds.get('api_key', ""),
+    rabbitx_creds.get('secret', ""),
+    rabbitx_creds.get('jwt_token', ""),
+    hyperliquid_creds.get('api_key', ""),
+    hyperliquid_creds.get('secret', "")
+)
 processor = get_data_processor()
 
-# Store clients in session state for cleanup
-st.session_state.client = client
-st.session_state.processor = processor
-
 # Check memory usage
 check_memory_usage()
 
@@ -182,11 +203,6 @@ def create_api_fields(exchange, required_fields):
     st.sidebar.subheader(f"{exchange.capitalize()}")
     values = {}
     
-    # Debug output for Hyperliquid and RabbitX
-    if exchange in ['hyperliquid', 'rabbitx']:
-        print(f"\nCreating {exchange.capitalize()} API fields:")
-        print(f"Current session state: {st.session_state.exchange_credentials.get(exchange, {})}")
-    
     for field in required_fields:
         # Special handling for Hyperliquid fields
         if exchange == 'hyperliquid':
@@ -195,9 +211,8 @@ def create_api_fields(exchange, required_fields):
             # Get value from session state first, then secrets
             default_value = st.session_state.exchange_credentials.get('hyperliquid', {}).get(
                 field,
-                st.secrets.get(secret_key, "")
+                _load_secret(secret_key)
             )
-            print(f"Loading {field_label}: {bool(default_value)}")  # Debug output
         # Special handling for RabbitX fields
         elif exchange == 'rabbitx':
             if field == "api_key":
@@ -212,13 +227,12 @@ def create_api_fields(exchange, required_fields):
             # Get value from session state first, then secrets
             default_value = st.session_state.exchange_credentials.get('rabbitx', {}).get(
                 field,
-                st.secrets.get(secret_key, "")
+                _load_secret(secret_key)
             )
-            print(f"Loading RabbitX {field_label}: {bool(default_value)}")  # Debug output
         else:
             field_label = field.replace('_', ' ').title()
             secret_key = f"{exchange.upper()}_{field.upper()}"
-            default_value = st.secrets.get(secret_key, "")
+            default_value = _load_secret(secret_key)
         
         value = st.sidebar.text_input(
             f"{exchange.capitalize()} {field_label}",
@@ -267,10 +281,6 @@ def create_api_fields(exchange, required_fields):
                     api_key = values['api_key']
                     api_secret = values['secret']
                     
-                    print(f"\nTesting Hyperliquid connection:")
-                    print(f"Wallet Address provided: {bool(api_key)}")
-                    print(f"Private Key provided: {bool(api_secret)}")
-                    
                     if api_key and api_secret:
                         try:
                             # Update credentials
@@ -283,17 +293,15 @@ def create_api_fields(exchange, required_fields):
                             client._hyperliquid_api_key = api_key
                             client._hyperliquid_secret = api_secret
                             
-                            # Test connection with debug output
-                            print("Attempting to test Hyperliquid connection...")
                             test_result = client.test_hyperliquid_connection()
-                            print(f"Hyperliquid test result: {test_result}")
+                            logger.debug("Hyperliquid test result: %s", test_result)
                             
                             if test_result:
                                 st.sidebar.success(f"✅ {exchange.capitalize()} Connected Successfully!")
                             else:
                                 st.sidebar.error(f"❌ {exchange.capitalize()} Connection Failed")
                         except Exception as e:
-                            print(f"Hyperliquid connection error: {str(e)}")
+                            logger.warning(f"Hyperliquid connection error: {str(e)}")
                             st.sidebar.error(f"❌ {exchange.capitalize()} Error: {str(e)}")
                     else:
                         st.sidebar.warning(f"Enter all {exchange.capitalize()} credentials to test connection")
@@ -301,10 +309,6 @@ def create_api_fields(exchange, required_fields):
                     api_key = values['api_key']
                     api_secret = values['secret']
                     
-                    print(f"\nTesting RabbitX connection:")
-                    print(f"API Key provided: {bool(api_key)}")
-                    print(f"Secret Key provided: {bool(api_secret)}")
-                    
                     if api_key and api_secret:
                         try:
                             # Update credentials
@@ -317,22 +321,20 @@ def create_api_fields(exchange, required_fields):
                             client._rabbitx_api_key = api_key
                             client._rabbitx_secret = api_secret
                             
-                            # Test connection with debug output
-                            print("Attempting to test RabbitX connection...")
                             test_result = client.test_rabbitx_connection()
-                            print(f"RabbitX test result: {test_result}")
+                            logger.debug("RabbitX test result: %s", test_result)
                             
                             if test_result:
                                 st.sidebar.success(f"✅ {exchange.capitalize()} Connected Successfully!")
                             else:
                                 st.sidebar.error(f"❌ {exchange.capitalize()} Connection Failed")
                         except Exception as e:
-                            print(f"RabbitX connection error: {str(e)}")
+                            logger.warning(f"RabbitX connection error: {str(e)}")
                             st.sidebar.error(f"❌ {exchange.capitalize()} Error: {str(e)}")
                     else:
                         st.sidebar.warning(f"Enter all {exchange.capitalize()} credentials to test connection")
             except Exception as e:
-                print(f"Connection error for {exchange}: {str(e)}")
+                logger.warning(f"Connection error for {exchange}: {str(e)}")
                 st.sidebar.error(f"❌ {exchange.capitalize()} Error: {str(e)}")
     else:
         st.sidebar.warning(f"Enter all {exchange.capitalize()} credentials to test connection")
@@ -340,12 +342,7 @@ def create_api_fields(exchange, required_fields):
     return values
 
 # Create API fields for each exchange
-credentials = {}
-credentials['binance'] = create_api_fields('binance', ['api_key', 'secret'])
-credentials['bybit'] = create_api_fields('bybit', ['api_key', 'secret'])
-credentials['okx'] = create_api_fields('okx', ['api_key', 'secret'])
-credentials['hyperliquid'] = create_api_fields('hyperliquid', ['api_key', 'secret'])
-credentials['rabbitx'] = create_api_fields('rabbitx', ['api_key', 'secret'])
+credentials = {exchange: create_api_fields(exchange, REQUIRED_FIELDS[exchange]) for exchange in EXCHANGES}
 
 # Update session state with new credentials
 st.session_state.exchange_credentials = credentials
@@ -353,71 +350,71 @@ st.session_state.exchange_credentials = credentials
 # Check if any exchange is configured
 has_active_exchanges = any(all(creds.values()) for creds in credentials.values())
 
-# Refresh button and auto-refresh
+# Time period selector, refresh button and auto-refresh
 col1, col2 = st.columns([8, 2])
+with col1:
+    days = st.selectbox(
+        "Select Time Period for Analysis",
+        options=[
+            (1, "1 day"),
+            (7, "7 days"),
+            (14, "14 days"),
+            (30, "30 days")
+        ],
+        index=1,  # Default to 7 days
+        help="Select the number of days to analyze funding payments and rates",
+        format_func=lambda x: x[1]  # Display the formatted string
+    )[0]  # Get the actual number value
 with col2:
     auto_refresh = st.checkbox("Auto-refresh (1m)", value=True)
     if st.button("🔄 Refresh Data"):
-        # Clean up before refresh
-        if 'client' in st.session_state:
-            del st.session_state.client
-        if 'processor' in st.session_state:
-            del st.session_state.processor
-        gc.collect()
         st.rerun()
 
-# Display funding rates first
-display_funding_rates(client)
-
-st.markdown("---")
-st.subheader("📊 Current Positions")
-
-# Get all positions with memory management
-all_positions = []
-error_logs = []
-
-# Get positions from exchanges with chunking
-for exchange in ['binance', 'bybit', 'okx', 'hyperliquid', 'rabbitx']:
-    try:
-        positions = get_cached_positions(exchange)
-        if positions:
-            # Process positions in chunks to save memory
-            chunk_size = 50
-            for i in range(0, len(positions), chunk_size):
-                chunk = positions[i:i + chunk_size]
-                all_positions.extend(chunk)
-                # Check memory after each chunk
-                if check_memory_usage():
-                    st.warning(f"Memory limit reached while processing {exchange} positions. Some data may be incomplete.")
-                    break
-    except Exception as e:
-        error_logs.append(f"Error fetching {exchange} positions: {str(e)}")
-        continue
-
-# Display any errors in an expander
-if error_logs:
-    with st.expander("🔍 Debug Information", expanded=False):
-        st.error("Some errors occurred while fetching data:")
-        for error in error_logs:
-            st.text(error)
-
-# Process and display positions
-positions_df = processor.aggregate_positions(all_positions, has_active_exchanges=True)
-render_positions_table(positions_df)
-
-# Clear unnecessary data
-del all_positions
-del positions_df
-gc.collect()
-
-# Auto-refresh logic with cleanup
-if auto_refresh:
-    time.sleep(60)
-    # Clean up before refresh
-    if 'client' in st.session_state:
-        del st.session_state.client
-    if 'processor' in st.session_state:
-        del st.session_state.processor
-    st.cache_data.clear()
-    gc.collect()
-    st.rerun()
\ No newline at end of file
+def render_dashboard():
+    """Render the funding rates and positions sections"""
+    # Display funding rates first
+    display_funding_rates(days)
+
+    st.markdown("---")
+    st.subheader("📊 Current Positions")
+
+    # Get all positions with memory management
+    all_positions = []
+    error_logs = []
+
+    # Get positions from all exchanges concurrently
+    # Read credentials on the script thread; their digest keeps sessions' cache entries apart
+    credentials = {exchange: _exchange_credentials(exchange) for exchange in EXCHANGES}
+    positions_by_exchange = {}
+    with script_executor(max_workers=len(EXCHANGES)) as executor:
+        futures = {
+            executor.submit(get_cached_positions, exchange, creds_hash, creds): exchange
+            for exchange, (creds, creds_hash) in credentials.items()
+        }
+        for future in as_completed(futures):
+            try:
+                positions_by_exchange[futures[future]] = future.result()
+            except Exception as e:
+                error_logs.append(f"Error fetching {futures[future]} positions: {str(e)}")
+
+    # Collect in a fixed exchange order so the table is stable across runs
+    for exchange in EXCHANGES:
+        all_positions.extend(positions_by_exchange.get(exchange) or [])
+
+    # Check memory once all positions are collected
+    if check_memory_usage():
+        st.warning("Memory limit reached while processing positions.")
+
+    # Display any errors in an expander
+    if error_logs:
+        with st.expander("🔍 Debug Information", expanded=False):
+            st.error("Some errors occurred while fetching data:")
+            for error in error_logs:
+                st.text(error)
+
+    # Process and display positions
+    positions_df = processor.aggregate_positions(all_positions, has_active_exchanges=True)
+    render_positions_table(positions_df)
+
+# Auto-refresh re-runs only the dashboard fragment on a timer; cached data expires by TTL
+st.fragment(render_dashboard, run_every=60 if auto_refresh else None)()
@@ -142,4 +142,29 @@ class TestDataProcessor:
         # Edge cases
         assert dp.extract_price_multiplier("BTC100") == 1.0  # Not a standard multiplier
         assert dp.extract_price_multiplier("k") == 1.0  # Just 'k' is not a multiplier
-        assert dp.extract_price_multiplier("ktest") == 1.0  # Second char not uppercase 
\ No newline at end of file
+        assert dp.extract_price_multiplier("ktest") == 1.0  # Second char not uppercase
+
+    def test_compress_df(self) -> None:
+        """Test compress_df downcasts integer columns and categorizes repeated text."""
+        df = pd.DataFrame({
+            'Exchange': ['Binance', 'Binance', 'Bybit', 'Bybit'],
+            'Token': ['BTC', 'ETH', 'SOL', 'PEPE'],
+            'count': [1, 2, 3, 4],
+            'rate': [0.0001, -0.0002, 0.0003, 0.0],
+        })
+
+        compressed = DataProcessor.compress_df(df)
+
+        # Low-cardinality text becomes categorical, unique text is left alone
+        assert isinstance(compressed['Exchange'].dtype, pd.CategoricalDtype)
+        assert not isinstance(compressed['Token'].dtype, pd.CategoricalDtype)
+
+        # Integer columns are downcast, floats keep full precision
+        assert compressed['count'].dtype == 'int8'
+        assert compressed['rate'].dtype == 'float64'
+        assert compressed['rate'].tolist() == [0.0001, -0.0002, 0.0003, 0.0]
+        assert compressed['count'].tolist() == [1, 2, 3, 4]
+
+        # Empty frames are returned unchanged
+        empty = pd.DataFrame(columns=['Exchange'])
+        assert DataProcessor.compress_df(empty).empty 
\ No newline at end of file
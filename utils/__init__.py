@@ -1,10 +1,11 @@
-from .exchange_client import ExchangeClient
+from .exchange_client import ExchangeClient, get_exchange_client
 from .data_processor import DataProcessor
 from .db_manager import DatabaseManager
 from .api_tester import test_binance_connection, test_bybit_connection, test_okx_connection
 
 __all__ = [
     'ExchangeClient',
+    'get_exchange_client',
     'DataProcessor',
     'DatabaseManager',
     'test_binance_connection',
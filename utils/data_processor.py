@@ -1,29 +1,38 @@
+import functools
+import re
 import pandas as pd
 import numpy as np
 from typing import Dict, List
 from datetime import datetime, timedelta
 
+# Symbol suffixes stripped during normalization, matched in this order of preference
+# at each position: USDT variations, OKX's -SWAP, then USD variations (RabbitX)
+_NORMALIZE_SUFFIX_RE = re.compile('|'.join(map(re.escape, [
+    '/USDT:USDT', ':USDT', '/USDT', '-USDT', 'USDT',
+    '-SWAP',
+    '-USD', '/USD', 'USD'
+])))
+
+# Suffixes stripped before detecting a price multiplier; bare 'USD' is kept
+_MULTIPLIER_SUFFIX_RE = re.compile('|'.join(map(re.escape, [
+    '/USDT:USDT', ':USDT', '/USDT', '-USDT', 'USDT',
+    '-SWAP',
+    '-USD', '/USD'
+])))
+
+# Symbol mappings for special cases
+_SYMBOL_MAPPINGS = {
+    'SOLAYER': 'LAYER',
+    'TRUMPOFFICIAL': 'TRUMP'
+}
+
 class DataProcessor:
     @staticmethod
+    @functools.lru_cache(maxsize=4096)  # The same few symbols are normalized many times per render
     def normalize_symbol(symbol: str) -> str:
         """Normalize token symbols across different exchanges"""
-        # Define symbol mappings for special cases
-        symbol_mappings = {
-            'SOLAYER':'LAYER',
-            'TRUMPOFFICIAL':'TRUMP'
-        }
-        
         # Clean the symbol by removing all variations of USDT suffix and exchange-specific formats
-        cleaned = symbol
-        variations = [
-            '/USDT:USDT', ':USDT', '/USDT', '-USDT', 'USDT',  # Standard USDT variations
-            '-SWAP',  # OKX specific
-            '-USD',   # Additional variations
-            '/USD',
-            'USD' # RabbitX specific
-        ]
-        for variation in variations:
-            cleaned = cleaned.replace(variation, '')
+        cleaned = _NORMALIZE_SUFFIX_RE.sub('', symbol)
         
         # Handle special case for tokens starting with multipliers (Bybit, Binance, OKX format: 1000TOSHI)
         if cleaned.startswith('1000000'):
@@ -53,13 +62,14 @@ class DataProcessor:
             return cleaned[:-suffix_len]
         
         # Return the mapped symbol if it exists, otherwise return the cleaned symbol
-        for key, value in symbol_mappings.items():
+        for key, value in _SYMBOL_MAPPINGS.items():
             if key in cleaned:
                 return value
 
         return cleaned
 
     @staticmethod
+    @functools.lru_cache(maxsize=4096)  # Called with the same few symbols as normalize_symbol
     def extract_price_multiplier(symbol: str) -> float:
         """Extract price multiplier from a symbol.
         
@@ -73,15 +83,7 @@ class DataProcessor:
         multiplier = 1.0
         
         # Clean the symbol by removing all variations of USDT suffix and exchange-specific formats
-        cleaned = symbol
-        variations = [
-            '/USDT:USDT', ':USDT', '/USDT', '-USDT', 'USDT',  # Standard USDT variations
-            '-SWAP',  # OKX specific
-            '-USD',   # Additional variations
-            '/USD',
-        ]
-        for variation in variations:
-            cleaned = cleaned.replace(variation, '')
+        cleaned = _MULTIPLIER_SUFFIX_RE.sub('', symbol)
         
         # Handle Bybit, Binance, OKX format: multiplier at start (e.g., 1000PEPE)
         if cleaned.startswith('1000000'):
@@ -105,6 +107,36 @@ class DataProcessor:
         
         return multiplier
 
+    @staticmethod
+    def compress_df(df: pd.DataFrame, max_category_ratio: float = 0.5) -> pd.DataFrame:
+        """Downcast integer columns and convert low-cardinality text columns to categories.
+
+        Float columns are left as float64, since rates and amounts shown in
+        charts and tables would pick up float32 rounding noise.
+
+        Args:
+            df: The DataFrame to compress. Columns are converted in place.
+            max_category_ratio: Largest ratio of unique values to rows for which
+                a text column is converted to the category dtype.
+
+        Returns:
+            pd.DataFrame: The same DataFrame with compressed dtypes.
+        """
+        if df.empty:
+            return df
+
+        for column in df.columns:
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(series):
+                continue
+            if pd.api.types.is_integer_dtype(series):
+                df[column] = pd.to_numeric(series, downcast='integer')
+            elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+                if series.nunique() / len(series) <= max_category_ratio:
+                    df[column] = series.astype('category')
+
+        return df
+
     @staticmethod
     def generate_mock_data():
         """Generate mock data for testing when exchange connections fail"""
@@ -26,6 +26,8 @@ import uuid
 import logging
 from .fee_tracker import FeeTracker
 
+logger = logging.getLogger(__name__)
+
 class BybitResponse(TypedDict):
     result: Dict[str, Dict[str, List[Dict[str, Any]]]]
 
@@ -50,6 +52,9 @@ class ExchangeClient:
         self._rabbitx_jwt_token = None
         self._rabbitx_client = None
         self._loop = None
+        # Pooled HTTP session so direct REST calls reuse TCP/TLS connections
+        self._http_session = requests.Session()
+        self._http_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=64))
         self.db_manager = DatabaseManager()
         self.data_processor = DataProcessor()
         self.fee_tracker = FeeTracker(self)
@@ -341,6 +346,8 @@ class ExchangeClient:
 
     def __del__(self):
         """Clean up resources when the instance is destroyed"""
+        if getattr(self, '_http_session', None):
+            self._http_session.close()
         if self._rabbitx_session:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
@@ -504,18 +511,27 @@ class ExchangeClient:
 
     @st.cache_data(ttl=60)
     def get_positions(_self, exchange: str) -> List[Dict[str, Any]]:
-        """Get positions from the specified exchange"""
+        """Get positions from the specified exchange, cached for a minute.
+
+        The cache is keyed on the exchange only, not on the credentials set on
+        the client; callers that key their own cache on credentials should use
+        fetch_positions.
+        """
+        return _self.fetch_positions(exchange)
+
+    def fetch_positions(self, exchange: str) -> List[Dict[str, Any]]:
+        """Get positions from the specified exchange without caching"""
         try:
             if exchange == 'hyperliquid':
                 print("Fetching Hyperliquid positions...")
                 try:
                     # Get positions from Hyperliquid API using POST request
-                    response = _self._make_hyperliquid_request(
+                    response = self._make_hyperliquid_request(
                         '/info',
                         method='POST',
                         data={
                             "type": "clearinghouseState",
-                            "user": _self._hyperliquid_api_key
+                            "user": self._hyperliquid_api_key
                         }
                     )
                     
@@ -561,17 +577,17 @@ class ExchangeClient:
 
             elif exchange == 'okx':
                 print(f"Attempting to fetch OKX positions...")
-                if not _self._okx_client:
+                if not self._okx_client:
                     print("OKX client is not initialized")
                     return []
                 try:
                     # Use the new /api/v5/account/positions endpoint
                     print("Calling OKX positions API...")
-                    response = _self._okx_client.fetch_positions()  # Changed to use CCXT's unified method
+                    response = self._okx_client.fetch_positions()  # Changed to use CCXT's unified method
                     print(f"OKX API Response: {response}")
                     
                     # Get contract multipliers for OKX markets
-                    contract_multipliers = _self._get_okx_contract_multipliers()
+                    contract_multipliers = self._get_okx_contract_multipliers()
                     
                     if response:
                         positions = []
@@ -580,7 +596,7 @@ class ExchangeClient:
                                 try:
                                     # Get the raw symbol and normalized symbol
                                     raw_symbol = pos['symbol']
-                                    normalized_symbol = _self.data_processor.normalize_symbol(raw_symbol.split(':')[0])
+                                    normalized_symbol = self.data_processor.normalize_symbol(raw_symbol.split(':')[0])
                                     
                                     # Get contract multiplier for this symbol (default to 1.0 if not found)
                                     contract_multiplier = contract_multipliers.get(raw_symbol, 1.0)
@@ -614,14 +630,14 @@ class ExchangeClient:
                     return []
                 except Exception as e:
                     print(f"Error fetching OKX positions: {str(e)}")
-                    print(f"OKX client state: {_self._okx_client}")
+                    print(f"OKX client state: {self._okx_client}")
                     return []
 
             elif exchange == 'bybit':
-                if not _self.bybit_client:
+                if not self.bybit_client:
                     return []
                 try:
-                    response = _self.bybit_client.get_positions(
+                    response = self.bybit_client.get_positions(
                         category="linear",
                         settleCoin="USDT"
                     )
@@ -630,7 +646,7 @@ class ExchangeClient:
                         return [
                             {
                                 'exchange': exchange,
-                                'symbol': _self.data_processor.normalize_symbol(pos['symbol']),
+                                'symbol': self.data_processor.normalize_symbol(pos['symbol']),
                                 'raw_symbol': pos['symbol'],
                                 'size': float(pos['size']),
                                 'side': 'long' if pos['side'].lower() == 'buy' else 'short',
@@ -648,11 +664,11 @@ class ExchangeClient:
                     return []
                     
             elif exchange == 'binance':
-                if not _self.binance_client:
+                if not self.binance_client:
                     return []
                 try:
-                    _self.binance_client.options['defaultType'] = 'future'
-                    raw_positions = _self.binance_client.fetch_positions()
+                    self.binance_client.options['defaultType'] = 'future'
+                    raw_positions = self.binance_client.fetch_positions()
                     
                     positions = []
                     for pos in raw_positions:
@@ -662,7 +678,7 @@ class ExchangeClient:
                             raw_symbol = pos['symbol']
                             positions.append({
                                 'exchange': 'binance',
-                                'symbol': _self.data_processor.normalize_symbol(raw_symbol),
+                                'symbol': self.data_processor.normalize_symbol(raw_symbol),
                                 'raw_symbol': raw_symbol,
                                 'size': size,
                                 'side': side,
@@ -679,10 +695,10 @@ class ExchangeClient:
                     print(f"Error fetching Binance positions: {str(e)}")
                     return []
             elif exchange == 'rabbitx':
-                if not _self.rabbitx_client:
+                if not self.rabbitx_client:
                     return []
                 try:
-                    raw_positions = _self.rabbitx_client.positions.list()
+                    raw_positions = self.rabbitx_client.positions.list()
                     print(f"\033[92mRabbitX positions: {raw_positions}\033[0m")
                     
                     positions = []
@@ -691,7 +707,7 @@ class ExchangeClient:
                             side = 'long' if pos['side'].lower() == 'buy' else 'short'
                             positions.append({
                                 'exchange': 'rabbitx',
-                                'symbol': _self.data_processor.normalize_symbol(pos['market_id']),
+                                'symbol': self.data_processor.normalize_symbol(pos['market_id']),
                                 'raw_symbol': pos['market_id'],
                                 'size': float(pos['size']),
                                 'side': side,
@@ -712,7 +728,7 @@ class ExchangeClient:
             print(f"Error in get_positions: {str(e)}")
             return []
 
-    @st.cache_data(ttl=300)
+    @st.cache_data(ttl=300, show_spinner=False)
     def get_funding_rate_history(_self, exchange: str, symbol: str, days: int = 7) -> pd.DataFrame:
         """Get funding rate history for a symbol from the specified exchange"""
         try:
@@ -827,7 +843,8 @@ class ExchangeClient:
                         df = pd.DataFrame(funding_rates)
                         if not df.empty:
                             df['fundingRate'] = df['fundingRate'].astype(float)
-                            df['fundingRateTimestamp'] = pd.to_datetime(df['fundingRateTimestamp'].astype(int), unit='ms')
+                            # Use the same time column name as the other exchanges
+                            df['fundingTime'] = pd.to_datetime(df.pop('fundingRateTimestamp').astype(int), unit='ms')
                             return df
                 except Exception as e:
                     print(f"Error fetching Bybit funding rates: {str(e)}")
@@ -872,11 +889,59 @@ class ExchangeClient:
             print(f"Error getting funding rates for {exchange}: {str(e)}")
             return pd.DataFrame()
 
+    async def get_funding_rate_history_batch(self, exchange: str, symbols: List[str], days: int = 7,
+                                             max_concurrency: int = 4) -> Dict[str, pd.DataFrame]:
+        """Get funding rate history for several symbols on one exchange.
+
+        None of the supported exchanges returns a full multi-day funding history
+        for many symbols in one request (Binance's symbol-less fundingRate query
+        is capped at 1000 rows across every contract, less than a day of data,
+        and Bybit requires a symbol), so each distinct symbol is fetched once
+        and the requests are issued concurrently.
+
+        Args:
+            exchange: Name of the exchange.
+            symbols: Raw exchange symbols, duplicates allowed.
+            days: Number of days of history to fetch.
+            max_concurrency: Maximum number of requests in flight at once.
+
+        Returns:
+            Dict[str, pd.DataFrame]: Funding rate history keyed by raw symbol.
+        """
+        unique_symbols = list(dict.fromkeys(symbols))
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(symbol):
+            async with semaphore:
+                return await asyncio.to_thread(self.get_funding_rate_history, exchange, symbol, days)
+
+        histories = await asyncio.gather(
+            *(fetch(symbol) for symbol in unique_symbols),
+            return_exceptions=True
+        )
+
+        funding_by_symbol = {}
+        for symbol, history in zip(unique_symbols, histories):
+            if isinstance(history, Exception):
+                logger.warning(f"Error fetching {exchange} funding rates for {symbol}: {str(history)}")
+                history = pd.DataFrame()
+            funding_by_symbol[symbol] = history
+        return funding_by_symbol
+
     @st.cache_data(ttl=300)
     def calculate_funding_payments(_self, exchange: str, days: int = 7) -> Dict[str, float]:
-        """Calculate total funding payments for all open positions over the specified period"""
+        """Calculate total funding payments for all open positions, cached for five minutes.
+
+        Like get_positions, the cache is keyed on the exchange and period only;
+        callers that key their own cache on credentials should use
+        fetch_funding_payments.
+        """
+        return _self.fetch_funding_payments(exchange, days)
+
+    def fetch_funding_payments(self, exchange: str, days: int = 7) -> Dict[str, float]:
+        """Calculate total funding payments for all open positions over the specified period without caching"""
         try:
-            positions = _self.get_positions(exchange)
+            positions = self.fetch_positions(exchange)
             funding_payments = {}
             
             for position in positions:
@@ -894,7 +959,7 @@ class ExchangeClient:
                             symbol = f"{symbol}-USDT-SWAP"
                     
                     print(f"Fetching funding rates for {exchange} position: {symbol}")
-                    funding_rates_df = _self.get_funding_rate_history(exchange, symbol, days)
+                    funding_rates_df = self.get_funding_rate_history(exchange, symbol, days)
                     # If the funding rate dataframe is empty, set funding payment as NA
                     if funding_rates_df.empty:
                         funding_payments[symbol] = float('nan')  # Use NaN to represent NA
@@ -967,10 +1032,10 @@ class ExchangeClient:
         
         try:
             if method == 'GET':
-                response = requests.get(url, headers=headers)
+                response = self._http_session.get(url, headers=headers)
             else:
                 print(f"Making request to {url} with data: {json_data}")
-                response = requests.post(url, headers=headers, json=data)
+                response = self._http_session.post(url, headers=headers, json=data)
             
             print(f"\nResponse Status: {response.status_code}")
             print(f"Response Headers: {json.dumps(dict(response.headers), indent=2)}")
@@ -1202,4 +1267,15 @@ class ExchangeClient:
             return multipliers
         except Exception as e:
             logging.error(f"Error loading OKX contract multipliers: {e}")
-            return {}
\ No newline at end of file
+            return {}
+
+@st.cache_resource(ttl=3600)  # Cache for 1 hour
+def get_exchange_client() -> ExchangeClient:
+    """Get a cached instance of the ExchangeClient shared by the app and its components.
+
+    The instance and its pooled HTTP session are reused across reruns and sessions.
+
+    Returns:
+        ExchangeClient: An initialized exchange client instance.
+    """
+    return ExchangeClient()
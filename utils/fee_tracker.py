@@ -13,7 +13,7 @@ class FeeTracker:
             'rabbitx': 0.0
         }
         
-    async def update_fees(self) -> Dict[str, float]:
+    def update_fees(self) -> Dict[str, float]:
         """Update and return trading fees for all exchanges"""
         try:
             # Reset fees at the start of update